@@ -0,0 +1,406 @@
+"""
+Benchmark suite for the training pipeline.
+
+Generates synthetic CSV datasets, serves them from a local stub aggregator under
+encrypted blob IDs and measures each stage of the pipeline: blob ID decryption,
+download, parse, fit and serialization for every algorithm, and ``/train``
+submission and ``/train/{job_id}/status`` latency under concurrent load. Results
+are written as JSON so that runs can be compared with ``--compare``.
+
+Usage:
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --rows 100000 --cols 20 --output results.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from stub_aggregator import StubAggregator, encrypt_blob_id
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("benchmarks")
+
+JWT_SECRET = "my-super-secret"
+TERMINAL = ("complete", "failed", "cancelled")
+
+
+def make_csv(rows: int, cols: int, classification: bool, seed: int = 0) -> bytes:
+    """
+    Generate a synthetic dataset with ``cols`` normally distributed features and a
+    ``target`` column: a noisy linear response, or its sign for classification.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, cols))
+    response = X @ rng.normal(size=cols) + rng.normal(scale=0.5, size=rows)
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(cols)])
+    df["target"] = (response > 0).astype(int) if classification else response
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def summarize(name: str, latencies: List[float], work: float = 0.0, unit: Optional[str] = None,
+              wall_time: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Summarize the latencies of one benchmark.
+
+    Args:
+        name (str): Benchmark name.
+        latencies (List[float]): Seconds per operation.
+        work (float): Units of work per operation (rows, bytes), for throughput in
+            ``unit`` per second. Without it, throughput is in operations per second.
+        unit (Optional[str]): Name of the work unit.
+        wall_time (Optional[float]): Elapsed time of concurrent operations. Defaults
+            to the sum of the latencies, for sequential operations.
+    """
+    values = np.asarray(latencies, dtype=float)
+    elapsed = wall_time if wall_time is not None else float(values.sum())
+    total_work = work * len(values) if work else len(values)
+    return {
+        "name": name,
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "throughput": total_work / elapsed if elapsed > 0 else None,
+        "throughput_unit": f"{unit}/s" if work else "ops/s"
+    }
+
+
+def timed(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """Run ``func`` ``repeat`` times and return the seconds each call took."""
+    latencies = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_stages(args: argparse.Namespace, workdir: Path, datasets: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Benchmark the pipeline stages in this process, one at a time."""
+    from threadpoolctl import threadpool_limits
+
+    from mltrainingserver.aggregator import aggregator_client
+    from mltrainingserver.algorithms import AVAILABLE_ALGORITHMS, build_estimator
+    from mltrainingserver.artifacts import save_model
+    from mltrainingserver.config import settings
+    from mltrainingserver.getDataset import _derive_jwt_key, decrypt_blob_id
+    from mltrainingserver.loader import load_dataset
+    from mltrainingserver.training import job_threads
+
+    results = []
+    regression = datasets["regression"]
+    key = _derive_jwt_key(JWT_SECRET)
+    results.append(summarize(
+        "decrypt", timed(lambda: decrypt_blob_id(regression["encrypted"], key), args.repeat * 10)
+    ))
+
+    download_path = workdir / "download.csv"
+    results.append(summarize(
+        "download",
+        timed(lambda: aggregator_client.download_blob(regression["blob_id"], str(download_path),
+                                                      settings.DOWNLOAD_CHUNK_SIZE), args.repeat),
+        work=regression["bytes"], unit="bytes"
+    ))
+
+    parse_dir = workdir / "parse"
+    # The loader accounts the parsed copy in the dataset cache index
+    Path(settings.DATASET_CACHE_PATH).mkdir(parents=True, exist_ok=True)
+
+    def fresh_copy() -> None:
+        shutil.rmtree(parse_dir, ignore_errors=True)
+        parse_dir.mkdir()
+        shutil.copy(download_path, parse_dir / "dataset.blob")
+
+    results.append(summarize(
+        "parse", timed(lambda: load_dataset(parse_dir / "dataset.blob"), args.repeat, setup=fresh_copy),
+        work=args.rows, unit="rows"
+    ))
+    results.append(summarize(
+        "parse_cached", timed(lambda: load_dataset(parse_dir / "dataset.blob"), args.repeat),
+        work=args.rows, unit="rows"
+    ))
+
+    frames = {}
+    for kind, dataset in datasets.items():
+        df = pd.read_csv(dataset["path"])
+        frames[kind] = (df.drop(columns=["target"]), df["target"])
+
+    threads = job_threads()
+    for algorithm in args.algorithms:
+        kind = AVAILABLE_ALGORITHMS[algorithm]["type"]
+        X, y = frames[kind]
+        X, y = X.iloc[:args.fit_rows], y.iloc[:args.fit_rows]
+        models = []
+
+        def fit() -> None:
+            model = build_estimator(algorithm, {}, n_jobs=threads)
+            with threadpool_limits(limits=threads):
+                model.fit(X, y)
+            models.append(model)
+
+        logger.info(f"Benchmarking {algorithm} on {len(X)} rows")
+        results.append(summarize(f"fit/{algorithm}", timed(fit, args.repeat), work=len(X), unit="rows"))
+        results.append(summarize(
+            f"serialize/{algorithm}",
+            timed(lambda: save_model(f"bench-{algorithm}", models[-1]), args.repeat)
+        ))
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_load(args: argparse.Namespace, datasets: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Benchmark the API under concurrent load: submit ``--jobs`` jobs from
+    ``--concurrency`` clients, poll their status from as many clients until all have
+    finished, and collect the phase timings the jobs recorded.
+    """
+    import httpx
+    import uvicorn
+
+    from mltrainingserver.algorithms import AVAILABLE_ALGORITHMS
+    from mltrainingserver.api import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="benchmark-server", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = []
+    try:
+        with httpx.Client(base_url=base_url, limits=limits, timeout=60) as client:
+            def submit(i: int) -> Dict[str, Any]:
+                algorithm = args.load_algorithms[i % len(args.load_algorithms)]
+                dataset = datasets[AVAILABLE_ALGORITHMS[algorithm]["type"]]
+                start = time.perf_counter()
+                response = client.post("/train", json={
+                    "dataset_hash": dataset["encrypted"], "algorithm": algorithm,
+                    # Identical requests would otherwise share one job
+                    "reuse": False
+                })
+                latency = time.perf_counter() - start
+                response.raise_for_status()
+                return {"job_id": response.json()["job_id"], "latency": latency}
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                submitted = list(pool.map(submit, range(args.jobs)))
+            results.append(summarize(
+                "api/train_submit", [s["latency"] for s in submitted], wall_time=time.perf_counter() - start
+            ))
+
+            job_ids = [s["job_id"] for s in submitted]
+            finished: Dict[str, Dict[str, Any]] = {}
+            status_latencies: List[float] = []
+            lock = threading.Lock()
+
+            deadline = time.monotonic() + args.load_timeout
+
+            def poll(worker: int) -> None:
+                i = worker
+                while True:
+                    with lock:
+                        remaining = [job_id for job_id in job_ids if job_id not in finished]
+                        if remaining and time.monotonic() > deadline:
+                            finished.update({job_id: {"status": "timeout"} for job_id in remaining})
+                            remaining = []
+                    if not remaining:
+                        return
+                    job_id = remaining[i % len(remaining)]
+                    i += 1
+                    start = time.perf_counter()
+                    job = client.get(f"/train/{job_id}/status").json()
+                    latency = time.perf_counter() - start
+                    with lock:
+                        status_latencies.append(latency)
+                        if job["status"] in TERMINAL:
+                            finished[job_id] = job
+                    time.sleep(args.poll_interval)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(poll, range(args.concurrency)))
+            drain_time = time.perf_counter() - start
+            results.append(summarize("api/train_status", status_latencies, wall_time=drain_time))
+
+            jobs = list(finished.values())
+            completed = [job for job in jobs if job["status"] == "complete"]
+            results.append({
+                "name": "api/jobs",
+                "count": len(jobs),
+                "complete": len(completed),
+                "failed": sum(job["status"] == "failed" for job in jobs),
+                "cancelled": sum(job["status"] == "cancelled" for job in jobs),
+                "timed_out": sum(job["status"] == "timeout" for job in jobs),
+                "throughput": len(completed) / drain_time if drain_time > 0 else None,
+                "throughput_unit": "jobs/s"
+            })
+            phases = sorted({phase for job in completed for phase in job.get("phase_timings") or {}})
+            for phase in phases:
+                timings = [job["phase_timings"][phase] for job in completed if phase in job["phase_timings"]]
+                results.append(summarize(f"job_phase/{phase}", timings))
+    finally:
+        server.should_exit = True
+        thread.join(10)
+    return results
+
+
+def compare(results: Dict[str, Any], baseline_path: Path) -> None:
+    """Print the p50 and p99 change of each benchmark against an earlier run."""
+    baseline = {r["name"]: r for r in json.loads(baseline_path.read_text())["results"]}
+    print(f"{'benchmark':32} {'p50':>12} {'p50 change':>11} {'p99':>12} {'p99 change':>11}")
+    for result in results["results"]:
+        if "p50" not in result:
+            continue
+        before = baseline.get(result["name"])
+        changes = []
+        for stat in ("p50", "p99"):
+            if before is None or not before.get(stat):
+                changes.append("n/a")
+            else:
+                changes.append(f"{(result[stat] / before[stat] - 1) * 100:+.1f}%")
+        print(f"{result['name']:32} {result['p50']:12.6f} {changes[0]:>11} {result['p99']:12.6f} {changes[1]:>11}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the ML training pipeline.")
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows of the synthetic datasets")
+    parser.add_argument("--cols", type=int, default=20, help="Feature columns of the synthetic datasets")
+    parser.add_argument("--fit-rows", type=int, default=5_000,
+                        help="Rows used for the per-algorithm fit benchmarks (kernel methods scale quadratically)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of each stage benchmark")
+    parser.add_argument("--algorithms", nargs="+", default=None,
+                        help="Algorithms to fit; defaults to all of them")
+    parser.add_argument("--jobs", type=int, default=50, help="Jobs submitted in the load benchmark")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients in the load benchmark")
+    parser.add_argument("--load-algorithms", nargs="+", default=["ridge", "logistic_regression"],
+                        help="Algorithms the load benchmark's jobs alternate between")
+    parser.add_argument("--poll-interval", type=float, default=0.01, help="Pause between status polls per client")
+    parser.add_argument("--load-timeout", type=float, default=600, help="Seconds to wait for load benchmark jobs")
+    parser.add_argument("--skip-stages", action="store_true", help="Skip the stage benchmarks")
+    parser.add_argument("--skip-load", action="store_true", help="Skip the load benchmark")
+    parser.add_argument("--output", type=Path, default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", type=Path, default=None, help="Results file of an earlier run to compare with")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    workdir = Path(tempfile.mkdtemp(prefix="mltraining-bench-"))
+    stub = StubAggregator().start()
+
+    # Isolate the service from any local state; settings are read on import
+    os.environ.update({
+        "AGGREGATOR_URL": stub.url,
+        "DATASET_CACHE_PATH": str(workdir / "cache"),
+        "MODEL_STORAGE_PATH": str(workdir / "models"),
+        "JOB_STORE_PATH": str(workdir / "jobs.db"),
+        "MAX_TRAINING_JOBS": str(max(args.jobs, 100)),
+        "PREDICT_WARMUP_JOB_IDS": "[]"
+    })
+    logging.getLogger("mltrainingserver").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    try:
+        from mltrainingserver.algorithms import AVAILABLE_ALGORITHMS
+        from mltrainingserver.config import settings
+
+        args.algorithms = args.algorithms or list(AVAILABLE_ALGORITHMS)
+        datasets: Dict[str, Dict[str, Any]] = {}
+        for kind in ("classification", "regression"):
+            data = make_csv(args.rows, args.cols, classification=kind == "classification")
+            blob_id = f"bench-{kind}-{args.rows}x{args.cols}"
+            stub.add_blob(blob_id, data)
+            path = workdir / f"{kind}.csv"
+            path.write_bytes(data)
+            datasets[kind] = {
+                "blob_id": blob_id,
+                "encrypted": encrypt_blob_id(blob_id, JWT_SECRET),
+                "bytes": len(data),
+                "path": path
+            }
+        logger.info(f"Generated datasets of {args.rows} rows x {args.cols} columns in {workdir}")
+
+        results: List[Dict[str, Any]] = []
+        if not args.skip_stages:
+            results += bench_stages(args, workdir, datasets)
+        if not args.skip_load:
+            results += bench_load(args, datasets)
+
+        import sklearn
+
+        report = {
+            "created_at": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "scikit-learn": sklearn.__version__
+            },
+            "parameters": {
+                key: value for key, value in vars(args).items() if key not in ("output", "compare")
+            },
+            "settings": {
+                "TRAINING_WORKERS": settings.TRAINING_WORKERS,
+                "THREADS_PER_JOB": settings.THREADS_PER_JOB,
+                "MODEL_COMPRESSION": settings.MODEL_COMPRESSION,
+                "DATASET_DOWNCAST_FLOATS": settings.DATASET_DOWNCAST_FLOATS
+            },
+            "results": results
+        }
+        if args.output is not None:
+            args.output.write_text(json.dumps(report, indent=2))
+            logger.info(f"Wrote results to {args.output}")
+        else:
+            print(json.dumps(report, indent=2))
+        if args.compare is not None:
+            compare(report, args.compare)
+        return report
+    finally:
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
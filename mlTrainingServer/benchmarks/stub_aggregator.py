@@ -0,0 +1,102 @@
+"""
+Local stand-in for the Walrus aggregator, serving in-memory blobs for benchmarks.
+"""
+import base64
+import hashlib
+import http.server
+import os
+import threading
+from typing import Dict, Optional
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+
+def encrypt_blob_id(blob_id: str, jwt_secret: str) -> str:
+    """
+    Encrypt a blob ID the way the marketplace does (CryptoJS AES with an OpenSSL salt
+    header), so that ``getDataset.decrypt_blob_id`` accepts it.
+
+    Args:
+        blob_id (str): The plaintext blob ID.
+        jwt_secret (str): The JWT secret whose hex SHA-256 is the passphrase.
+
+    Returns:
+        str: The Base64 ciphertext.
+    """
+    # Imported here because importing the service reads its settings, which must
+    # point at the stub first
+    from mltrainingserver.getDataset import _openssl_kdf
+
+    passphrase = hashlib.sha256(jwt_secret.encode('utf-8')).hexdigest().encode('utf-8')
+    salt = os.urandom(8)
+    key, iv = _openssl_kdf(passphrase, salt)
+    ciphertext = AES.new(key, AES.MODE_CBC, iv).encrypt(pad(blob_id.encode('utf-8'), AES.block_size))
+    return base64.b64encode(b"Salted__" + salt + ciphertext).decode('ascii')
+
+
+class _BlobHandler(http.server.BaseHTTPRequestHandler):
+    """Serves ``GET /v1/blobs/{blob_id}`` with optional single byte ranges."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        blob_id = self.path.rsplit("/", 1)[-1]
+        data = self.server.blobs.get(blob_id) if self.path.startswith("/v1/blobs/") else None
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, last = range_header[len("bytes="):].split("-", 1)
+            start = int(first)
+            end = min(int(last), len(data) - 1) if last else len(data) - 1
+            body = data[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubAggregator:
+    """
+    Threaded HTTP server on a free local port that serves registered blobs.
+
+    Point ``AGGREGATOR_URL`` at ``url`` before the service modules are imported.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = http.server.ThreadingHTTPServer((host, port), _BlobHandler)
+        self._server.daemon_threads = True
+        self._server.blobs: Dict[str, bytes] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_blob(self, blob_id: str, data: bytes) -> None:
+        """Serve ``data`` as the blob ``blob_id``."""
+        self._server.blobs[blob_id] = data
+
+    def start(self) -> "StubAggregator":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-aggregator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
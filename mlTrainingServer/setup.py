@@ -12,6 +12,8 @@ setup(
         "scikit-learn",
         "joblib",
         "pycryptodome",
+        "requests",
+        "httpx",
     ],
     python_requires=">=3.8",
 ) 
\ No newline at end of file
@@ -0,0 +1,431 @@
+"""
+Module containing the HTTP client for the Walrus aggregator.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Errors after which a partial download is resumed with a Range request
+_RESUMABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class IncompleteDownloadError(Exception):
+    """Raised when the aggregator closes a response before the full body was received."""
+
+
+class _CountingRetry(Retry):
+    """urllib3 Retry that reports every retry to the owning client."""
+
+    on_retry = None
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        if self.on_retry is not None:
+            self.on_retry()
+        retry.on_retry = self.on_retry
+        return retry
+
+
+class _ClientMetrics:
+    """Thread-safe request, byte, latency and retry counters shared by the aggregator clients."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "bytes_downloaded": 0,
+            "retries": 0,
+            "resumes": 0,
+            "failures": 0,
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of the client's request, byte, latency and retry counters."""
+        with self._lock:
+            return dict(self._metrics)
+
+    def _record(self, name: str, value: float) -> None:
+        with self._lock:
+            self._metrics[name] += value
+
+    def _record_request(self, latency: float) -> None:
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["latency_seconds_total"] += latency
+            self._metrics["latency_seconds_max"] = max(self._metrics["latency_seconds_max"], latency)
+
+
+class AggregatorClient(_ClientMetrics):
+    """
+    Pooled, retrying client for downloading blobs from a Walrus aggregator.
+
+    Connections are kept alive and reused across downloads. Failed requests are
+    retried with exponential backoff, and a download interrupted mid-body is resumed
+    from the last received byte with an HTTP Range request.
+    """
+
+    def __init__(self, base_url: str, connect_timeout: float = 10, read_timeout: float = 60,
+                 max_retries: int = 5, backoff_factor: float = 0.5, pool_size: int = 16):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        retry = _CountingRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False
+        )
+        retry.on_retry = lambda: self._record("retries", 1)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def blob_url(self, blob_id: str) -> str:
+        """Return the aggregator URL of a blob."""
+        return f"{self.base_url}/v1/blobs/{blob_id}"
+
+    def get(self, blob_id: str, start: int = 0, end: Optional[int] = None) -> requests.Response:
+        """
+        Send a streaming GET for a blob, optionally for the byte range ``start``-``end``.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+            start (int): First byte to request.
+            end (Optional[int]): Last byte to request, inclusive. Defaults to the end of the blob.
+
+        Returns:
+            requests.Response: The open response; the caller must close it.
+        """
+        headers = {}
+        if start or end is not None:
+            headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+        started = time.monotonic()
+        try:
+            response = self.session.get(
+                self.blob_url(blob_id), headers=headers, stream=True, timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            self._record("failures", 1)
+            raise
+        self._record_request(time.monotonic() - started)
+        return response
+
+    def iter_blob(self, blob_id: str, chunk_size: int) -> Iterator[bytes]:
+        """
+        Yield the content of a blob, resuming with Range requests after dropped connections.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+            chunk_size (int): Size of the yielded chunks in bytes.
+
+        Yields:
+            bytes: Consecutive chunks of the blob.
+        """
+        offset = 0
+        total = None
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = self.get(blob_id, start=offset)
+                if offset and response.status_code != 206:
+                    raise Exception("Aggregator ignored the Range request, cannot resume download")
+                if total is None:
+                    content_length = response.headers.get('content-length')
+                    total = int(content_length) if content_length else None
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        offset += len(chunk)
+                        self._record("bytes_downloaded", len(chunk))
+                        yield chunk
+                if total is not None and offset < total:
+                    raise IncompleteDownloadError(f"Received {offset} of {total} bytes")
+                return
+            except (*_RESUMABLE_ERRORS, IncompleteDownloadError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._record("failures", 1)
+                    raise
+                delay = self.backoff_factor * (2 ** (attempt - 1))
+                logger.warning(f"Download of blob interrupted at byte {offset} ({str(e)}), "
+                               f"resuming in {delay:.1f}s")
+                self._record("resumes", 1)
+                time.sleep(delay)
+            finally:
+                if response is not None:
+                    response.close()
+
+    def download_blob(self, blob_id: str, output_file: str, chunk_size: int) -> int:
+        """
+        Download a blob to a file.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+            output_file (str): The file to write the blob to.
+            chunk_size (int): Read size in bytes.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        written = 0
+        with Path(output_file).open('wb') as f:
+            for chunk in self.iter_blob(blob_id, chunk_size):
+                f.write(chunk)
+                written += len(chunk)
+        return written
+
+    def probe(self, blob_id: str) -> Tuple[Optional[int], bool]:
+        """
+        Return the size of a blob and whether the aggregator serves byte ranges for it.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+
+        Returns:
+            Tuple[Optional[int], bool]: The blob size in bytes (None if unknown) and
+            whether Range requests are supported.
+        """
+        response = self.get(blob_id, start=0, end=0)
+        try:
+            content_range = response.headers.get('content-range', '')
+            if response.status_code == 206 and '/' in content_range:
+                total = content_range.rsplit('/', 1)[1]
+                return (int(total) if total != '*' else None), True
+            content_length = response.headers.get('content-length')
+            return (int(content_length) if content_length else None), False
+        finally:
+            response.close()
+
+    def download_blob_ranged(self, blob_id: str, output_file: str, size: int, connections: int,
+                             chunk_size: int, expected_sha256: Optional[str] = None) -> str:
+        """
+        Download a blob over several concurrent Range requests.
+
+        The output file is preallocated to ``size`` bytes and each range is written in
+        place with ``pwrite``. A range interrupted mid-body is retried from its last
+        received byte, independently of the other ranges.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+            output_file (str): The file to write the blob to.
+            size (int): The blob size in bytes, as returned by ``probe``.
+            connections (int): Number of ranges fetched concurrently.
+            chunk_size (int): Read size in bytes.
+            expected_sha256 (Optional[str]): If given, the download fails unless the
+                content has this SHA-256 digest.
+
+        Returns:
+            str: The SHA-256 hex digest of the downloaded content.
+        """
+        part_size = -(-size // connections)
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        logger.info(f"Downloading {size} bytes in {len(ranges)} ranges")
+
+        fd = os.open(output_file, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, size)
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="blob-range") as pool:
+                futures = [pool.submit(self._fetch_range, blob_id, fd, start, end, chunk_size)
+                           for start, end in ranges]
+                for future in futures:
+                    future.result()
+        finally:
+            os.close(fd)
+
+        digest = hashlib.sha256()
+        with Path(output_file).open('rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        checksum = digest.hexdigest()
+        if expected_sha256 is not None and checksum != expected_sha256:
+            raise Exception(f"Checksum mismatch for blob: expected {expected_sha256}, got {checksum}")
+        return checksum
+
+    def _fetch_range(self, blob_id: str, fd: int, start: int, end: int, chunk_size: int) -> None:
+        """Write bytes ``start``-``end`` of a blob into ``fd``, resuming after interruptions."""
+        position = start
+        attempt = 0
+        while position <= end:
+            response = None
+            try:
+                response = self.get(blob_id, start=position, end=end)
+                if response.status_code != 206:
+                    raise Exception("Aggregator ignored the Range request")
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        chunk = chunk[:end + 1 - position]
+                        os.pwrite(fd, chunk, position)
+                        position += len(chunk)
+                        self._record("bytes_downloaded", len(chunk))
+                if position <= end:
+                    raise IncompleteDownloadError(f"Range ended at byte {position - 1} of {end}")
+            except (*_RESUMABLE_ERRORS, IncompleteDownloadError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._record("failures", 1)
+                    raise
+                delay = self.backoff_factor * (2 ** (attempt - 1))
+                logger.warning(f"Range {start}-{end} interrupted at byte {position} ({str(e)}), "
+                               f"resuming in {delay:.1f}s")
+                self._record("resumes", 1)
+                time.sleep(delay)
+            finally:
+                if response is not None:
+                    response.close()
+
+
+class AsyncAggregatorClient(_ClientMetrics):
+    """
+    asyncio counterpart of ``AggregatorClient`` built on httpx.
+
+    Uses the same timeouts, retry budget, backoff and Range resume behaviour, so
+    downloads can run on the event loop without occupying a thread each.
+    """
+
+    def __init__(self, base_url: str, connect_timeout: float = 10, read_timeout: float = 60,
+                 max_retries: int = 5, backoff_factor: float = 0.5, pool_size: int = 16):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def blob_url(self, blob_id: str) -> str:
+        """Return the aggregator URL of a blob."""
+        return f"{self.base_url}/v1/blobs/{blob_id}"
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled httpx client, created on first use inside the running event loop."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def iter_blob(self, blob_id: str, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Yield the content of a blob, retrying failed requests and resuming dropped downloads.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+            chunk_size (int): Size of the yielded chunks in bytes.
+
+        Yields:
+            bytes: Consecutive chunks of the blob.
+        """
+        offset = 0
+        total = None
+        attempt = 0
+        while True:
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            started = time.monotonic()
+            try:
+                async with self.client.stream("GET", self.blob_url(blob_id), headers=headers) as response:
+                    if response.status_code in (429, 500, 502, 503, 504):
+                        raise httpx.HTTPStatusError(
+                            f"Retryable status {response.status_code}",
+                            request=response.request, response=response
+                        )
+                    response.raise_for_status()
+                    self._record_request(time.monotonic() - started)
+                    if offset and response.status_code != 206:
+                        raise Exception("Aggregator ignored the Range request, cannot resume download")
+                    if total is None:
+                        content_length = response.headers.get('content-length')
+                        total = int(content_length) if content_length else None
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        if chunk:
+                            offset += len(chunk)
+                            self._record("bytes_downloaded", len(chunk))
+                            yield chunk
+                if total is not None and offset < total:
+                    raise IncompleteDownloadError(f"Received {offset} of {total} bytes")
+                return
+            except (httpx.TransportError, httpx.HTTPStatusError, IncompleteDownloadError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 429
+                attempt += 1
+                if not retryable or attempt > self.max_retries:
+                    self._record("failures", 1)
+                    raise
+                delay = self.backoff_factor * (2 ** (attempt - 1))
+                logger.warning(f"Async download of blob interrupted at byte {offset} ({str(e)}), "
+                               f"retrying in {delay:.1f}s")
+                self._record("resumes" if offset else "retries", 1)
+                await asyncio.sleep(delay)
+
+    async def download_blob(self, blob_id: str, output_file: str, chunk_size: int) -> str:
+        """
+        Download a blob to a file.
+
+        Args:
+            blob_id (str): The plaintext blob ID.
+            output_file (str): The file to write the blob to.
+            chunk_size (int): Read size in bytes.
+
+        Returns:
+            str: The SHA-256 hex digest of the downloaded content.
+        """
+        digest = hashlib.sha256()
+        with Path(output_file).open('wb') as f:
+            async for chunk in self.iter_blob(blob_id, chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+aggregator_client = AggregatorClient(
+    base_url=settings.AGGREGATOR_URL,
+    connect_timeout=settings.AGGREGATOR_CONNECT_TIMEOUT,
+    read_timeout=settings.AGGREGATOR_READ_TIMEOUT,
+    max_retries=settings.AGGREGATOR_MAX_RETRIES,
+    backoff_factor=settings.AGGREGATOR_BACKOFF_FACTOR,
+    pool_size=settings.AGGREGATOR_POOL_SIZE
+)
+
+async_aggregator_client = AsyncAggregatorClient(
+    base_url=settings.AGGREGATOR_URL,
+    connect_timeout=settings.AGGREGATOR_CONNECT_TIMEOUT,
+    read_timeout=settings.AGGREGATOR_READ_TIMEOUT,
+    max_retries=settings.AGGREGATOR_MAX_RETRIES,
+    backoff_factor=settings.AGGREGATOR_BACKOFF_FACTOR,
+    pool_size=settings.AGGREGATOR_POOL_SIZE
+)
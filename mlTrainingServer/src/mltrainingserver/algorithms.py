@@ -1,3 +1,16 @@
+"""
+Registry of the ML algorithms available for training.
+"""
+from typing import Any, Dict, Tuple
+
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import (
+    ElasticNet, Lasso, LinearRegression, LogisticRegression, Ridge, SGDClassifier, SGDRegressor
+)
+from sklearn.metrics import accuracy_score, log_loss, mean_squared_error, r2_score
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC, SVR
+
 AVAILABLE_ALGORITHMS = {
     # Classification Algorithms
     "random_forest": {
@@ -236,4 +249,193 @@ AVAILABLE_ALGORITHMS = {
             }
         }
     }
-} 
\ No newline at end of file
+}
+
+# Estimator factory per algorithm, with parallelism hints used to size each job:
+# "n_jobs" means the estimator takes an n_jobs parameter, "blas" that it spends
+# most of its fit time in multithreaded BLAS/OpenMP routines. Estimators with
+# neither fit on a single thread.
+ESTIMATORS: Dict[str, Dict[str, Any]] = {
+    "random_forest": {"factory": RandomForestClassifier, "n_jobs": True, "blas": False},
+    "gradient_boosting": {"factory": GradientBoostingClassifier, "n_jobs": False, "blas": False},
+    "svm": {"factory": SVC, "n_jobs": False, "blas": False},
+    "logistic_regression": {"factory": LogisticRegression, "n_jobs": False, "blas": True},
+    "knn": {"factory": KNeighborsClassifier, "n_jobs": True, "blas": True},
+    "linear_regression": {"factory": LinearRegression, "n_jobs": True, "blas": True},
+    "ridge": {"factory": Ridge, "n_jobs": False, "blas": True},
+    "lasso": {"factory": Lasso, "n_jobs": False, "blas": True},
+    "elastic_net": {"factory": ElasticNet, "n_jobs": False, "blas": True},
+    "svr": {"factory": SVR, "n_jobs": False, "blas": False},
+}
+
+def _linear_kernel(params: Dict[str, Any]) -> None:
+    if params.get("kernel", "rbf") != "linear":
+        raise ValueError("Incremental training only supports the linear kernel")
+
+# Incremental (partial_fit) counterparts used for out-of-core training, built from
+# the request parameters and the number of rows. SGD minimizes the mean loss, so
+# penalties defined on the summed loss (C, Ridge's alpha) are divided by the rows.
+def _incremental_svm(params: Dict[str, Any], n_samples: int) -> Any:
+    _linear_kernel(params)
+    return SGDClassifier(loss="hinge", alpha=1.0 / (params.get("C", 1.0) * n_samples))
+
+def _incremental_svr(params: Dict[str, Any], n_samples: int) -> Any:
+    _linear_kernel(params)
+    return SGDRegressor(
+        loss="epsilon_insensitive",
+        epsilon=params.get("epsilon", 0.1),
+        alpha=1.0 / (params.get("C", 1.0) * n_samples)
+    )
+
+INCREMENTAL_ESTIMATORS: Dict[str, Any] = {
+    "logistic_regression": lambda params, n_samples: SGDClassifier(
+        loss="log_loss", alpha=1.0 / (params.get("C", 1.0) * n_samples)
+    ),
+    "svm": _incremental_svm,
+    "linear_regression": lambda params, n_samples: SGDRegressor(
+        penalty=None, fit_intercept=params.get("fit_intercept", True)
+    ),
+    "ridge": lambda params, n_samples: SGDRegressor(
+        penalty="l2", alpha=params.get("alpha", 1.0) / n_samples,
+        fit_intercept=params.get("fit_intercept", True)
+    ),
+    "lasso": lambda params, n_samples: SGDRegressor(
+        penalty="l1", alpha=params.get("alpha", 1.0),
+        fit_intercept=params.get("fit_intercept", True)
+    ),
+    "elastic_net": lambda params, n_samples: SGDRegressor(
+        penalty="elasticnet", alpha=params.get("alpha", 1.0), l1_ratio=params.get("l1_ratio", 0.5),
+        fit_intercept=params.get("fit_intercept", True)
+    ),
+    "svr": _incremental_svr,
+}
+
+_TRUE_STRINGS = {"true", "1", "yes", "on"}
+_FALSE_STRINGS = {"false", "0", "no", "off"}
+_NONE_STRINGS = {"none", "null", ""}
+
+def _coerce_value(name: str, spec: Dict[str, Any], value: Any) -> Any:
+    """Convert a request parameter value to the type declared for it."""
+    if value is None or (isinstance(value, str) and value.strip().lower() in _NONE_STRINGS):
+        if spec["default"] is None:
+            return None
+        raise ValueError(f"Parameter '{name}' cannot be empty")
+
+    param_type = spec["type"]
+    try:
+        if param_type == "bool":
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text in _TRUE_STRINGS:
+                return True
+            if text in _FALSE_STRINGS:
+                return False
+            raise ValueError(value)
+        if param_type == "int":
+            if isinstance(value, bool):
+                raise ValueError(value)
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError(value)
+            return int(number)
+        if param_type == "float":
+            if isinstance(value, bool):
+                raise ValueError(value)
+            return float(value)
+        value = str(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Parameter '{name}' must be of type {param_type}, got {value!r}")
+
+    options = spec.get("options")
+    if options and value not in options:
+        raise ValueError(f"Parameter '{name}' must be one of {options}, got {value!r}")
+    return value
+
+def coerce_params(algorithm: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate request parameters against an algorithm's declared parameters.
+
+    Args:
+        algorithm (str): The algorithm name.
+        params (Dict[str, Any]): Parameters as sent in the request.
+
+    Returns:
+        Dict[str, Any]: The parameters converted to their declared types.
+
+    Raises:
+        ValueError: If the algorithm or a parameter is unknown, or a value is invalid.
+    """
+    if algorithm not in AVAILABLE_ALGORITHMS:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    declared = AVAILABLE_ALGORITHMS[algorithm]["parameters"]
+    unknown = [name for name in params if name not in declared]
+    if unknown:
+        raise ValueError(f"Unknown parameters for {algorithm}: {unknown}")
+    return {name: _coerce_value(name, declared[name], value) for name, value in params.items()}
+
+def build_estimator(algorithm: str, params: Dict[str, Any], n_jobs: int = 1) -> Any:
+    """
+    Create an unfitted estimator for an algorithm.
+
+    Args:
+        algorithm (str): The algorithm name.
+        params (Dict[str, Any]): Parameters as sent in the request.
+        n_jobs (int): Parallelism granted to the job, used for estimators that take
+            an ``n_jobs`` parameter unless the request sets it.
+
+    Returns:
+        Any: The scikit-learn estimator.
+    """
+    kwargs = coerce_params(algorithm, params)
+    entry = ESTIMATORS[algorithm]
+    if entry["n_jobs"] and kwargs.get("n_jobs") is None:
+        kwargs["n_jobs"] = n_jobs
+    return entry["factory"](**kwargs)
+
+def blas_threads(algorithm: str, threads: int) -> int:
+    """
+    Limit for the BLAS/OpenMP thread pools while fitting or scoring an algorithm.
+
+    Only estimators that spend their fit in these routines get the job's threads; the
+    others get one, so that their ``n_jobs`` workers do not each start a full pool.
+    """
+    return threads if ESTIMATORS[algorithm]["blas"] else 1
+
+def build_incremental_estimator(algorithm: str, params: Dict[str, Any], n_samples: int = 1) -> Any:
+    """
+    Create an unfitted estimator supporting ``partial_fit`` for out-of-core training.
+
+    Args:
+        algorithm (str): The algorithm name.
+        params (Dict[str, Any]): Parameters as sent in the request.
+        n_samples (int): Number of training rows, used to scale the regularization.
+
+    Returns:
+        Any: The SGD-based scikit-learn estimator.
+
+    Raises:
+        ValueError: If the algorithm or its parameters have no incremental counterpart.
+    """
+    kwargs = coerce_params(algorithm, params)
+    if algorithm not in INCREMENTAL_ESTIMATORS:
+        raise ValueError(f"Algorithm {algorithm} does not support incremental training")
+    return INCREMENTAL_ESTIMATORS[algorithm](kwargs, max(1, n_samples))
+
+def evaluate(algorithm: str, model: Any, X: Any, y: Any) -> Tuple[float, float]:
+    """
+    Score a fitted model.
+
+    Returns R² and mean squared error for regression, and accuracy and log loss for
+    classification (zero-one loss when the model has no probability estimates).
+
+    Returns:
+        Tuple[float, float]: The (accuracy, loss) pair reported in ``TrainingMetrics``.
+    """
+    y_pred = model.predict(X)
+    if AVAILABLE_ALGORITHMS[algorithm]["type"] == "regression":
+        return float(r2_score(y, y_pred)), float(mean_squared_error(y, y_pred))
+    accuracy = float(accuracy_score(y, y_pred))
+    if hasattr(model, "predict_proba"):
+        return accuracy, float(log_loss(y, model.predict_proba(X), labels=model.classes_))
+    return accuracy, 1.0 - accuracy
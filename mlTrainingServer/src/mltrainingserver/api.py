@@ -1,33 +1,59 @@
 """
 API module for ML training service.
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-from typing import Dict, Any, List
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Set, Tuple
+import asyncio
+import base64
+import binascii
+import json
 import logging
-import threading
+import shutil
 import traceback
-from fastapi.responses import FileResponse
+import zlib
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pathlib import Path
 
 from .models import (
     TrainingRequest,
     TrainingResponse,
+    BatchTrainingRequest,
+    BatchTrainingResponse,
+    JobPage,
+    PredictRequest,
+    PredictResponse,
+    SweepRequest,
     TrainingMetrics,
     AvailableAlgorithms,
     TrainingStatus,
-    AlgorithmInfo,
-    AlgorithmParameter
+    AlgorithmInfo
 )
-from .algorithms import AVAILABLE_ALGORITHMS
+from .algorithms import AVAILABLE_ALGORITHMS, build_incremental_estimator, coerce_params
 from .training import (
     validate_access,
     run_training,
     create_job,
+    update_job,
+    delete_job,
     get_job_status,
-    get_job_metrics
+    get_job_metrics,
+    transition_job,
+    job_store
 )
+from .scheduler import ACTIVE_STATUSES, scheduler, QueueFullError
+from .sweep import build_candidates, run_sweep
+from .incremental import run_incremental_training
+from .aggregator import aggregator_client, async_aggregator_client
+from .config import settings
+from .artifacts import delete_model, read_manifest
+from .events import job_events
+from .serving import model_cache, prediction_batcher, warmup
+from .jobstore import TERMINAL_STATUSES
+from .memoization import find_reusable_job, request_fingerprint
+from .telemetry import format_metric, job_telemetry
+from .getDataset import prefetch_dataset_async, resolve_blob_ids
 
 # Configure logging
 logging.basicConfig(
@@ -70,25 +96,315 @@ app.add_middleware(
 
 # Available algorithms
 ALGORITHMS = {
-    "linear_regression": AlgorithmInfo(
-        name="Linear Regression",
-        description="A linear approach to modeling the relationship between a dependent variable and one or more independent variables",
-        type="regression",
-        parameters={
-            "fit_intercept": AlgorithmParameter(
-                type="bool",
-                default=True,
-                description="Whether to calculate the intercept for this model"
-            ),
-            "normalize": AlgorithmParameter(
-                type="bool",
-                default=False,
-                description="Whether to normalize the features"
-            )
-        }
-    )
+    name: AlgorithmInfo(**info)
+    for name, info in AVAILABLE_ALGORITHMS.items()
 }
 
+def _job_with_position(job_id: str) -> Dict[str, Any]:
+    """Return a copy of the job status with its current queue position."""
+    job = dict(get_job_status(job_id))
+    job["queue_position"] = scheduler.queue_position(job_id)
+    return job
+
+# Datasets being prefetched, and the tasks doing it (kept referenced until done)
+_prefetching: Set[str] = set()
+_prefetch_tasks: Set[asyncio.Task] = set()
+_prefetch_semaphore: Optional[asyncio.Semaphore] = None
+
+async def _prefetch(dataset_hash: str) -> None:
+    """Download a queued job's dataset into the cache while it waits for a worker."""
+    global _prefetch_semaphore
+    if _prefetch_semaphore is None:
+        _prefetch_semaphore = asyncio.Semaphore(settings.PREFETCH_CONCURRENCY)
+    try:
+        async with _prefetch_semaphore:
+            await prefetch_dataset_async(dataset_hash, "my-super-secret")
+    except Exception as e:
+        # The job downloads the dataset itself when prefetching fails
+        logger.warning(f"Prefetch failed for dataset {dataset_hash}: {str(e)}")
+    finally:
+        _prefetching.discard(dataset_hash)
+
+def _schedule_prefetch(dataset_hash: str) -> None:
+    """Start prefetching a dataset unless it is already being prefetched."""
+    if not settings.PREFETCH_ENABLED or dataset_hash in _prefetching:
+        return
+    _prefetching.add(dataset_hash)
+    task = asyncio.create_task(_prefetch(dataset_hash))
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
+
+def _ensure_capacity() -> None:
+    """Reject the request with 429 when the training queue is full."""
+    if scheduler.is_full():
+        logger.warning("Training queue is full, rejecting request")
+        raise HTTPException(
+            status_code=429,
+            detail="Training queue is full, retry later",
+            headers={"Retry-After": "30"}
+        )
+
+def _validate_training_request(request: TrainingRequest) -> None:
+    """Check a training request's algorithm, parameters and options, raising ValueError."""
+    coerce_params(request.algorithm, request.params)
+    if request.incremental:
+        if request.test_size is not None or request.cv_folds is not None:
+            raise ValueError("test_size and cv_folds are not supported in incremental mode")
+        build_incremental_estimator(request.algorithm, request.params)
+
+def _training_call(job_id: str, request: TrainingRequest,
+                   blob_id: Optional[str]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Function running a training request, and its arguments.
+
+    The job gets the blob ID resolved here, as the decryption is only memoized within
+    a process and every job runs in a new one. Without it, the job decrypts the
+    dataset hash itself and reports a failed decryption.
+    """
+    kwargs = {
+        "job_id": job_id,
+        "dataset_hash": request.dataset_hash,
+        "blob_id": blob_id,
+        "algorithm": request.algorithm,
+        "params": request.params,
+        "features": request.features,
+        "target": request.target
+    }
+    if request.incremental:
+        kwargs.update(epochs=request.epochs, chunk_rows=request.chunk_rows)
+        return run_incremental_training, kwargs
+    kwargs.update(
+        test_size=request.test_size,
+        cv_folds=request.cv_folds,
+        shuffle=request.shuffle,
+        random_state=request.random_state
+    )
+    return run_training, kwargs
+
+def _encode_cursor(job: Dict[str, Any]) -> str:
+    """Opaque pagination cursor pointing after a job."""
+    raw = json.dumps([job["created_at"], job["job_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+        return str(created_at), str(job_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _utc_isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Format a time like the job store's naive UTC timestamps."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+def _forget_job(job_id: str) -> None:
+    """Remove a job from the store and its model from the model cache."""
+    delete_job(job_id)
+    model_cache.invalidate(job_id)
+
+def _queue_job(job_id: str, target: Any, kwargs: Dict[str, Any], priority: int) -> None:
+    """Submit a created job to the worker pool, deleting it again if the pool is full."""
+    try:
+        position = scheduler.submit(job_id, target, kwargs, priority=priority)
+    except QueueFullError as e:
+        _forget_job(job_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    logger.info(f"Queued job {job_id} at position {position}")
+
+# The helpers below read and write the job store and, in queue mode, the SQLite job
+# queue, which may wait on locks held by workers. Handlers run them in a thread with
+# asyncio.to_thread so that the event loop keeps serving other requests.
+
+def _submit_training(request: TrainingRequest, fingerprint: Optional[str]) -> str:
+    """Create a training job and queue it, returning its ID."""
+    # Apply backpressure before creating the job
+    _ensure_capacity()
+    
+    try:
+        job_id = create_job(
+            dataset_hash=request.dataset_hash,
+            algorithm=request.algorithm,
+            params=request.params,
+            features=request.features,
+            target=request.target,
+            fingerprint=fingerprint
+        )
+        logger.info(f"Created job with ID: {job_id}")
+    except Exception as e:
+        logger.error(f"Failed to create job: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
+    
+    blob_ids = resolve_blob_ids([request.dataset_hash], "my-super-secret")
+    target, kwargs = _training_call(job_id, request, blob_ids[request.dataset_hash])
+    _queue_job(job_id, target, kwargs, priority=request.priority)
+    return job_id
+    _schedule_prefetch(dataset_hash)
+
+def _submit_sweep(request: SweepRequest, candidates: List[Dict[str, Any]]) -> str:
+    """Create a sweep job over ``candidates`` and queue it, returning its ID."""
+    _ensure_capacity()
+    
+    job_id = create_job(
+        dataset_hash=request.dataset_hash,
+        algorithm=request.algorithm,
+        params={},
+        features=request.features,
+        target=request.target
+    )
+    update_job(job_id, kind="sweep", candidates=len(candidates))
+    logger.info(f"Created sweep job {job_id} with {len(candidates)} candidates")
+    
+    _queue_job(
+        job_id,
+        run_sweep,
+        {
+            "job_id": job_id,
+            "dataset_hash": request.dataset_hash,
+            "blob_id": resolve_blob_ids([request.dataset_hash], "my-super-secret")[request.dataset_hash],
+            "algorithm": request.algorithm,
+            "candidates": candidates,
+            "features": request.features,
+            "target": request.target,
+            "validation_fraction": request.validation_fraction,
+            "successive_halving": request.successive_halving,
+            "halving_factor": request.halving_factor,
+            "random_state": request.random_state
+        },
+        priority=request.priority
+    )
+    return job_id
+
+def _submit_batch(items: List[TrainingRequest], groups: Dict[str, List[int]]) -> List[Dict[str, Any]]:
+    """
+    Create and queue the jobs of a validated batch, whose request indices are grouped
+    by dataset, and return the job of each request.
+    """
+    # Requests identical to an existing job, or to an earlier request of the batch,
+    # follow that job
+    fingerprints = [request_fingerprint(item) for item in items]
+    job_ids: List[str] = [""] * len(items)
+    reused: Set[int] = set()
+    new_jobs: Dict[str, int] = {}
+    for index, (item, fingerprint) in enumerate(zip(items, fingerprints)):
+        if not item.reuse or fingerprint is None:
+            continue
+        reusable = find_reusable_job(item, fingerprint)
+        if reusable is not None:
+            job_ids[index] = reusable["job_id"]
+            reused.add(index)
+        elif fingerprint in new_jobs:
+            reused.add(index)
+        else:
+            new_jobs[fingerprint] = index
+
+    new_count = len(items) - len(reused)
+    if scheduler.free_slots() < new_count:
+        logger.warning(f"Training queue cannot take {new_count} more jobs, rejecting batch")
+        raise HTTPException(
+            status_code=429,
+            detail="Training queue is full, retry later",
+            headers={"Retry-After": "30"}
+        )
+
+    # Decrypt each dataset hash once for all jobs on it
+    blob_ids = resolve_blob_ids(list(groups), "my-super-secret")
+
+    # Create the jobs dataset by dataset and queue them together, deleting the
+    # created jobs again if any of them cannot be queued
+    created: List[str] = []
+    submissions = []
+    try:
+        for indices in groups.values():
+            for index in indices:
+                if index in reused:
+                    continue
+                item = items[index]
+                job_id = create_job(
+                    dataset_hash=item.dataset_hash,
+                    algorithm=item.algorithm,
+                    params=item.params,
+                    features=item.features,
+                    target=item.target,
+                    fingerprint=fingerprints[index]
+                )
+                created.append(job_id)
+                job_ids[index] = job_id
+                target, kwargs = _training_call(job_id, item, blob_ids[item.dataset_hash])
+                submissions.append((job_id, target, kwargs, item.priority))
+        positions = dict(zip(
+            (submission[0] for submission in submissions),
+            scheduler.submit_many(submissions)
+        ))
+    except BaseException as e:
+        for job_id in created:
+            _forget_job(job_id)
+        if isinstance(e, QueueFullError):
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+        raise
+    for index in reused:
+        if not job_ids[index]:
+            job_ids[index] = job_ids[new_jobs[fingerprints[index]]]
+    logger.info(f"Queued {len(submissions)} jobs on {len(groups)} datasets, reused {len(reused)}")
+
+    jobs = []
+    for index, job_id in enumerate(job_ids):
+        job = get_job_status(job_id)
+        job["queue_position"] = positions.get(job_id, scheduler.queue_position(job_id))
+        job["reused"] = index in reused
+        jobs.append(job)
+    return jobs
+
+# Background task removing expired jobs from the job store
+_compaction_task: Optional[asyncio.Task] = None
+
+def _expire_jobs() -> List[str]:
+    """Remove expired jobs from the job store, and their models from disk and the model cache."""
+    removed = job_store.compact(settings.JOB_TTL_SECONDS)
+    for job_id in removed:
+        # Also evicts the model from the model cache
+        delete_model(job_id)
+    return removed
+
+async def _compact_jobs() -> None:
+    """Periodically remove finished jobs older than JOB_TTL_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.JOB_COMPACTION_INTERVAL)
+        try:
+            removed = await asyncio.to_thread(_expire_jobs)
+            if removed:
+                logger.info(f"Removed {len(removed)} expired jobs from the job store")
+        except Exception as e:
+            logger.error(f"Job store compaction failed: {str(e)}")
+
+@app.on_event("startup")
+async def start_compaction() -> None:
+    """Start the periodic job store compaction."""
+    global _compaction_task
+    _compaction_task = asyncio.create_task(_compact_jobs())
+
+@app.on_event("startup")
+async def warmup_models() -> None:
+    """Load the models listed in PREDICT_WARMUP_JOB_IDS into the model cache."""
+    if settings.PREDICT_WARMUP_JOB_IDS:
+        loaded, _ = await asyncio.to_thread(warmup, settings.PREDICT_WARMUP_JOB_IDS)
+        logger.info(f"Warmed up {len(loaded)} models")
+
+@app.on_event("shutdown")
+async def shutdown_scheduler() -> None:
+    """Terminate running training processes and close aggregator connections on shutdown."""
+    scheduler.shutdown()
+    for task in list(_prefetch_tasks):
+        task.cancel()
+    if _compaction_task is not None:
+        _compaction_task.cancel()
+    await async_aggregator_client.aclose()
+
 @app.get(
     "/algorithms",
     response_model=AvailableAlgorithms,
@@ -127,46 +443,27 @@ async def start_training(request: TrainingRequest, background_tasks: BackgroundT
             logger.error(f"Access denied for dataset: {request.dataset_hash}")
             raise HTTPException(status_code=403, detail="Access to dataset denied")
         
-        # Create the job
+        # Validate algorithm, parameters and options
         try:
-            job_id = create_job(
-                dataset_hash=request.dataset_hash,
-                algorithm=request.algorithm,
-                params=request.params,
-                features=request.features,
-                target=request.target
-            )
-            logger.info(f"Created job with ID: {job_id}")
-        except Exception as e:
-            logger.error(f"Failed to create job: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
+            _validate_training_request(request)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Start training in background
-        def run_training_task():
-            try:
-                logger.info(f"Starting training for job {job_id}")
-                run_training(
-                    job_id=job_id,
-                    dataset_hash=request.dataset_hash,
-                    algorithm=request.algorithm,
-                    params=request.params,
-                    features=request.features,
-                    target=request.target
-                )
-                logger.info(f"Training completed for job {job_id}")
-            except Exception as e:
-                logger.error(f"Background training failed for job {job_id}: {str(e)}")
-                logger.error(traceback.format_exc())
+        # Follow an identical in-flight or completed job instead of training again
+        fingerprint = request_fingerprint(request)
+        if request.reuse and fingerprint is not None:
+            reusable = await asyncio.to_thread(find_reusable_job, request, fingerprint)
+            if reusable is not None:
+                logger.info(f"Reusing job {reusable['job_id']} for identical request")
+                job = await asyncio.to_thread(_job_with_position, reusable["job_id"])
+                return {**job, "reused": True}
         
-        # Start the training in a separate thread
-        thread = threading.Thread(target=run_training_task)
-        thread.daemon = True
-        thread.start()
-        logger.info(f"Started background training thread for job {job_id}")
+        # Create the job and queue it on the worker pool
+        job_id = await asyncio.to_thread(_submit_training, request, fingerprint)
+        _schedule_prefetch(request.dataset_hash)
         
         # Return the job information
-        return get_job_status(job_id)
+        return await asyncio.to_thread(_job_with_position, job_id)
         
     except HTTPException:
         raise
@@ -175,6 +472,159 @@ async def start_training(request: TrainingRequest, background_tasks: BackgroundT
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post(
+    "/train/batch",
+    response_model=BatchTrainingResponse,
+    tags=["training"],
+    summary="Start training jobs in bulk",
+    description="Start many training jobs in one request; jobs on the same dataset share one download.",
+    response_description="Job IDs and initial status of the training jobs, in request order."
+)
+async def start_training_batch(request: BatchTrainingRequest) -> Dict[str, Any]:
+    """
+    Start several training jobs at once.
+    
+    Requests are grouped by dataset: access is checked and the dataset prefetched once
+    per dataset, and jobs on the same dataset are queued next to each other so they
+    share a single download. Either all jobs are queued or, if any request is invalid
+    or the queue lacks room for all of them, none is.
+    """
+    try:
+        items = request.requests
+        logger.info(f"Received batch of {len(items)} training requests")
+        if len(items) > settings.MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch has {len(items)} requests, more than {settings.MAX_BATCH_SIZE}"
+            )
+        
+        # Validate every request and group them by dataset
+        groups: Dict[str, List[int]] = {}
+        for index, item in enumerate(items):
+            try:
+                _validate_training_request(item)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Request {index}: {str(e)}")
+            groups.setdefault(item.dataset_hash, []).append(index)
+        for dataset_hash in groups:
+            if not validate_access(dataset_hash):
+                logger.error(f"Access denied for dataset: {dataset_hash}")
+                raise HTTPException(status_code=403, detail=f"Access to dataset {dataset_hash} denied")
+        
+        # Create and queue the jobs, then prefetch each dataset once
+        jobs = await asyncio.to_thread(_submit_batch, items, groups)
+        for dataset_hash in groups:
+            _schedule_prefetch(dataset_hash)
+        return {"jobs": jobs}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in start_training_batch: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get(
+    "/jobs",
+    response_model=JobPage,
+    tags=["training"],
+    summary="List jobs",
+    description="Get the status and metrics of many jobs, filtered by status and creation time.",
+    response_description="A page of jobs ordered by creation time and the cursor of the next page."
+)
+async def list_jobs(
+    status: Optional[List[TrainingStatus]] = Query(None, description="Only jobs with these statuses; repeat for several"),
+    created_after: Optional[datetime] = Query(None, description="Only jobs created at or after this time (UTC)"),
+    created_before: Optional[datetime] = Query(None, description="Only jobs created before this time (UTC)"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of jobs per page"),
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page")
+) -> Dict[str, Any]:
+    """
+    List jobs in bulk.
+    
+    Pages follow the job store's status and creation time indexes, so deep pages cost
+    as much as the first one.
+    """
+    try:
+        jobs = await asyncio.to_thread(
+            job_store.query,
+            statuses=status,
+            created_after=_utc_isoformat(created_after),
+            created_before=_utc_isoformat(created_before),
+            after=_decode_cursor(cursor) if cursor else None,
+            limit=limit + 1
+        )
+        next_cursor = _encode_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+        return {"jobs": jobs[:limit], "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing jobs: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post(
+    "/sweep",
+    response_model=TrainingResponse,
+    tags=["training"],
+    summary="Start hyperparameter sweep",
+    description="Start a grid or random search over an algorithm's parameters on one dataset.",
+    response_description="Job ID and initial status of the sweep job."
+)
+async def start_sweep(request: SweepRequest) -> Dict[str, Any]:
+    """
+    Start a hyperparameter sweep job.
+    
+    The dataset is loaded once and the candidates are fitted in parallel. The best
+    candidate is refit on the full dataset and stored as the job's model.
+    """
+    try:
+        logger.info(f"Received sweep request for algorithm {request.algorithm}")
+        
+        # Validate dataset access
+        if not validate_access(request.dataset_hash):
+            logger.error(f"Access denied for dataset: {request.dataset_hash}")
+            raise HTTPException(status_code=403, detail="Access to dataset denied")
+        
+        # Expand the search space
+        try:
+            candidates = build_candidates(
+                request.algorithm, request.search, request.space,
+                n_iter=request.n_iter, random_state=request.random_state
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        job_id = await asyncio.to_thread(_submit_sweep, request, candidates)
+        _schedule_prefetch(request.dataset_hash)
+        return await asyncio.to_thread(_job_with_position, job_id)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in start_sweep: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get(
+    "/sweep/{job_id}",
+    tags=["training"],
+    summary="Get sweep results",
+    description="Get the status of a sweep job and, once complete, its ranked leaderboard.",
+    response_description="Sweep status, best parameters and leaderboard."
+)
+async def get_sweep(job_id: str) -> Dict[str, Any]:
+    """
+    Get the status and leaderboard of a sweep job.
+    """
+    try:
+        job = await asyncio.to_thread(_job_with_position, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if job.get("kind") != "sweep":
+        raise HTTPException(status_code=404, detail=f"Job {job_id} is not a sweep")
+    return job
+
 @app.get(
     "/train/{job_id}/status",
     tags=["training"],
@@ -187,7 +637,7 @@ async def check_job_status(job_id: str) -> Dict[str, Any]:
     Get the status of a training job.
     """
     try:
-        return get_job_status(job_id)
+        return await asyncio.to_thread(_job_with_position, job_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -195,6 +645,138 @@ async def check_job_status(job_id: str) -> Dict[str, Any]:
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete(
+    "/train/{job_id}",
+    tags=["training"],
+    summary="Cancel training job",
+    description="Cancel a pending or running training job. A pending job leaves the queue; a running job's "
+                "process is killed and its partial files and model artifact are removed.",
+    response_description="The cancelled job."
+)
+async def cancel_training(job_id: str) -> Dict[str, Any]:
+    """
+    Cancel a training job.
+    """
+    try:
+        get_job_status(job_id)
+        # Marking the job first makes the scheduler ignore any later update of it
+        if not transition_job(
+            job_id,
+            ACTIVE_STATUSES,
+            status=TrainingStatus.CANCELLED,
+            completed_at=datetime.utcnow().isoformat()
+        ):
+            status = get_job_status(job_id)["status"]
+            raise HTTPException(
+                status_code=409,
+                detail=f"Job {job_id} has already finished ({getattr(status, 'value', status)})"
+            )
+        scheduler.cancel(job_id)
+        logger.info(f"Cancelled job {job_id}")
+        return get_job_status(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling job: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _job_event_stream(job_ids: List[str]):
+    """
+    Stream the updates of jobs as server-sent events until all of them have finished.
+
+    Each job is first sent as a ``status`` event holding the whole job, followed by
+    ``update`` events holding only the changed fields. When the client falls behind,
+    or after ``EVENT_KEEPALIVE_SECONDS`` without updates, the jobs are re-read from
+    the job store and sent again as ``status`` events, which also picks up jobs run
+    by other processes.
+    """
+    # Subscribe before reading the jobs so that no update falls in between
+    with job_events.subscribe(job_ids) as subscription:
+        remaining = set(job_ids)
+
+        def snapshots():
+            subscription.lagged = False
+            for job_id in sorted(remaining):
+                try:
+                    job = get_job_status(job_id)
+                except ValueError:
+                    remaining.discard(job_id)
+                    yield _sse("not_found", {"job_id": job_id})
+                    continue
+                if job["status"] in TERMINAL_STATUSES:
+                    remaining.discard(job_id)
+                yield _sse("status", job)
+
+        for message in snapshots():
+            yield message
+        while remaining:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), settings.EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                for message in snapshots():
+                    yield message
+                continue
+            if event["job_id"] in remaining:
+                yield _sse("update", event)
+                if event.get("status") in TERMINAL_STATUSES:
+                    remaining.discard(event["job_id"])
+            if subscription.lagged:
+                # Updates were dropped; the queue may still hold stale ones
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                for message in snapshots():
+                    yield message
+
+def _event_response(job_ids: List[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _job_event_stream(job_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get(
+    "/train/events",
+    tags=["training"],
+    summary="Stream updates of several jobs",
+    description="Follow many training jobs over one server-sent event stream.",
+    response_description="A text/event-stream of job status snapshots and updates."
+)
+async def stream_jobs_events(job_id: List[str] = Query(..., description="Job IDs to follow; repeat the parameter for each job")):
+    """
+    Stream status transitions and phase timings of several jobs.
+    
+    Every event carries a ``job_id``. Unknown jobs produce a ``not_found`` event. The
+    stream ends once all jobs have completed or failed.
+    """
+    return _event_response(list(dict.fromkeys(job_id)))
+
+@app.get(
+    "/train/{job_id}/events",
+    tags=["training"],
+    summary="Stream training updates",
+    description="Follow a training job over a server-sent event stream instead of polling its status.",
+    response_description="A text/event-stream of job status snapshots and updates."
+)
+async def stream_job_events(job_id: str):
+    """
+    Stream status transitions and phase timings of a training job.
+    
+    The stream ends once the job has completed or failed.
+    """
+    try:
+        get_job_status(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return _event_response([job_id])
+
 @app.get(
     "/train/{job_id}/metrics",
     response_model=TrainingMetrics,
@@ -223,12 +805,18 @@ async def get_job_metrics_endpoint(job_id: str) -> Dict[str, Any]:
     description="Download the trained model for a completed job.",
     response_description="The trained model file or a message indicating the model is not available."
 )
-async def download_model(job_id: str):
+async def download_model(job_id: str, request: Request):
     """
     Download the trained model.
     
+    The ETag is derived from the artifact's SHA-256, so clients holding the current
+    model get a 304 for ``If-None-Match``. ``Range`` and ``If-Range`` requests resume
+    interrupted downloads. Clients sending ``Accept-Encoding: gzip`` get an
+    uncompressed artifact gzip-compressed on the fly unless they request a range.
+    
     Args:
         job_id (str): The ID of the training job.
+        request (Request): The incoming request, for its conditional headers.
     
     Returns:
         FileResponse: The trained model file.
@@ -238,7 +826,10 @@ async def download_model(job_id: str):
     """
     try:
         # Get job status to check if training is complete
-        job_status = get_job_status(job_id)
+        try:
+            job_status = get_job_status(job_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
         
         if job_status["status"] != TrainingStatus.COMPLETE:
             raise HTTPException(
@@ -247,18 +838,47 @@ async def download_model(job_id: str):
             )
         
         # Get model path from job status
-        model_path = Path(job_status.get("model_path"))
-        if not model_path or not model_path.exists():
+        model_path = Path(job_status.get("model_path") or "")
+        if not job_status.get("model_path") or not model_path.exists():
             raise HTTPException(
                 status_code=404,
                 detail="Model file not found"
             )
         
-        # Return the model file
+        artifact = job_status.get("artifact") or read_manifest(model_path)
+        filename = f"model_{job_id}.joblib"
+        if artifact is None:
+            # Models saved without a manifest get FileResponse's mtime-based ETag
+            return FileResponse(path=str(model_path), filename=filename, media_type="application/octet-stream")
+        
+        etag = f'"{artifact["sha256"]}"'
+        gzip_etag = f'"{artifact["sha256"]}-gzip"'
+        if _etag_matches(request.headers.get("if-none-match"), (etag, gzip_etag)):
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+        
+        if (
+            settings.MODEL_DOWNLOAD_GZIP
+            and not artifact.get("compression")
+            and "range" not in request.headers
+            and _accepts_gzip(request.headers.get("accept-encoding"))
+        ):
+            return StreamingResponse(
+                _gzip_file(model_path),
+                media_type="application/octet-stream",
+                headers={
+                    "Content-Encoding": "gzip",
+                    "Content-Disposition": f'attachment; filename="{filename}"',
+                    "ETag": gzip_etag,
+                    "Vary": "Accept-Encoding"
+                }
+            )
+        
+        # Return the model file; FileResponse serves Range and If-Range requests
         return FileResponse(
             path=str(model_path),
-            filename=f"model_{job_id}.joblib",
-            media_type="application/octet-stream"
+            filename=filename,
+            media_type="application/octet-stream",
+            headers={"ETag": etag, "Vary": "Accept-Encoding"}
         )
         
     except HTTPException:
@@ -268,15 +888,207 @@ async def download_model(job_id: str):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+def _etag_matches(if_none_match: Optional[str], etags: Tuple[str, ...]) -> bool:
+    """Whether an If-None-Match header matches one of the current ETags (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip."""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip()
+            if not quality.startswith("q="):
+                return True
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+def _gzip_file(path: Path):
+    """Yield the gzip-compressed content of a file chunk by chunk."""
+    compressor = zlib.compressobj(settings.MODEL_DOWNLOAD_GZIP_LEVEL, zlib.DEFLATED, 31)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(settings.DOWNLOAD_CHUNK_SIZE), b""):
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
+@app.post(
+    "/predict/{job_id}",
+    response_model=PredictResponse,
+    tags=["training"],
+    summary="Predict with a trained model",
+    description="Predict a batch of rows with the model of a completed job.",
+    response_description="One prediction per row."
+)
+async def predict(job_id: str, request: PredictRequest) -> Dict[str, Any]:
+    """
+    Predict rows with a trained model.
+    
+    Models are kept deserialized in an in-memory LRU cache, and concurrent requests
+    for the same model are predicted together in one vectorized call.
+    """
+    try:
+        try:
+            loaded = await asyncio.to_thread(model_cache.get, job_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        try:
+            frame = loaded.to_frame(request.rows)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            predictions = await prediction_batcher.predict(loaded, frame)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
+        return {"job_id": job_id, "predictions": predictions.tolist()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in predict: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post(
+    "/predict/{job_id}/warmup",
+    tags=["training"],
+    summary="Warm up a model",
+    description="Load the model of a completed job into the prediction cache ahead of its first request.",
+    response_description="The state of the model cache."
+)
+async def warmup_model(job_id: str) -> Dict[str, Any]:
+    """
+    Load a model into the prediction cache.
+    """
+    loaded, errors = await asyncio.to_thread(warmup, [job_id])
+    if errors:
+        raise HTTPException(status_code=404, detail=errors[job_id])
+    return {"job_id": job_id, "cache": model_cache.stats()}
+
+def _collect_metrics() -> str:
+    """Render the service metrics in the Prometheus text exposition format."""
+    stats = scheduler.stats()
+    jobs = job_store.count_by_status()
+    cache = model_cache.stats()
+    lookups = cache["hits"] + cache["misses"]
+    clients = {"sync": aggregator_client.metrics(), "async": async_aggregator_client.metrics()}
+
+    lines: List[str] = []
+    lines += format_metric("mltraining_queue_depth", "gauge", "Jobs waiting for a worker",
+                           [({}, stats["queued"])])
+    lines += format_metric("mltraining_jobs", "gauge", "Jobs in the job store, by status",
+                           [({"status": status.value}, jobs.get(status.value, 0)) for status in TrainingStatus])
+    lines += format_metric("mltraining_workers", "gauge", "Training workers available to run jobs",
+                           [({}, stats["workers"])])
+    lines += format_metric("mltraining_workers_busy", "gauge", "Training workers running a job",
+                           [({}, stats["running"])])
+    lines += format_metric("mltraining_worker_utilization", "gauge", "Share of training workers running a job",
+                           [({}, stats["running"] / stats["workers"] if stats["workers"] else 0.0)])
+    lines += format_metric("mltraining_worker_busy_seconds_total", "counter",
+                           "Time training workers have spent running jobs", [({}, stats["busy_seconds"])])
+    lines += format_metric("mltraining_workers_stuck", "gauge", "Jobs running well past TRAINING_TIMEOUT",
+                           [({}, stats["stuck"])])
+    lines += job_telemetry.render()
+    for name, key, help_text in (
+        ("mltraining_aggregator_requests_total", "requests", "Requests sent to the aggregator"),
+        ("mltraining_aggregator_bytes_downloaded_total", "bytes_downloaded", "Bytes received from the aggregator"),
+        ("mltraining_aggregator_retries_total", "retries", "Aggregator requests retried"),
+        ("mltraining_aggregator_resumes_total", "resumes", "Interrupted downloads resumed"),
+        ("mltraining_aggregator_failures_total", "failures", "Aggregator requests that failed for good"),
+        ("mltraining_aggregator_latency_seconds_total", "latency_seconds_total",
+         "Aggregator request latency, summed over requests")
+    ):
+        lines += format_metric(name, "counter", f"{help_text} by the API process (prefetches)",
+                               [({"client": client}, metrics[key]) for client, metrics in clients.items()])
+    lines += format_metric("mltraining_model_cache_requests_total", "counter", "Model cache lookups, by result",
+                           [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])])
+    lines += format_metric("mltraining_model_cache_hit_ratio", "gauge", "Share of model lookups served from the cache",
+                           [({}, cache["hits"] / lookups if lookups else 0.0)])
+    lines += format_metric("mltraining_model_cache_evictions_total", "counter", "Models evicted from the cache",
+                           [({}, cache["evictions"])])
+    lines += format_metric("mltraining_model_cache_bytes", "gauge", "Approximate size of the cached models",
+                           [({}, cache["bytes"])])
+    lines += format_metric("mltraining_model_cache_models", "gauge", "Models in the cache",
+                           [({}, cache["models"])])
+    return "\n".join(lines) + "\n"
+
+@app.get(
+    "/metrics",
+    tags=["system"],
+    summary="Service metrics",
+    description="Queue, job, phase latency, download, cache and worker metrics in the Prometheus text format.",
+    response_description="Metrics in the Prometheus text exposition format."
+)
+async def metrics() -> Response:
+    """
+    Export service metrics for Prometheus.
+    """
+    try:
+        body = await asyncio.to_thread(_collect_metrics)
+        return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+    except Exception as e:
+        logger.error(f"Error collecting metrics: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _free_disk_bytes(path: Path) -> int:
+    """Free space on the filesystem holding ``path``, or its nearest existing parent."""
+    path = path.resolve()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return shutil.disk_usage(path).free
+
 @app.get(
     "/health",
     tags=["system"],
     summary="Health check",
-    description="Check the health status of the service.",
-    response_description="Current health status and timestamp."
+    description="Readiness check: fails with 503 when the training pool is saturated or wedged, "
+                "or when disk space under MODEL_STORAGE_PATH runs low.",
+    response_description="Readiness status and the result of each check."
 )
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Response:
     """
-    Health check endpoint.
+    Readiness check endpoint.
     """
-    return {"status": "healthy"} 
\ No newline at end of file
+    # Queue statistics come from SQLite, which can wait on workers holding the write lock
+    stats = await asyncio.to_thread(scheduler.stats)
+    free_bytes = await asyncio.to_thread(_free_disk_bytes, Path(settings.MODEL_STORAGE_PATH))
+    checks = {
+        "queue": {
+            "ok": stats["queued"] + stats["running"] < stats["max_jobs"],
+            "queued": stats["queued"],
+            "running": stats["running"],
+            "max_jobs": stats["max_jobs"]
+        },
+        "workers": {
+            # Local worker threads start with the first job and never exit on their own;
+            # queue workers register when they start and heartbeat until they stop
+            "ok": stats["workers"] > 0 and stats["workers_alive"] == stats["workers_started"] and stats["stuck"] == 0,
+            "alive": stats["workers_alive"],
+            "started": stats["workers_started"],
+            "stuck": stats["stuck"]
+        },
+        "disk": {
+            "ok": free_bytes >= settings.HEALTH_MIN_FREE_BYTES,
+            "free_bytes": free_bytes,
+            "min_free_bytes": settings.HEALTH_MIN_FREE_BYTES
+        }
+    }
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "unavailable", "checks": checks}
+    )
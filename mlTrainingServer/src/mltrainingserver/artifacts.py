@@ -0,0 +1,226 @@
+"""
+Module for storing and loading trained model artifacts.
+"""
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy
+from joblib.compressor import _COMPRESSORS
+import sklearn
+
+from .cache import file_sha256
+from .config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Buffer between the pickler and the compressor, as used by joblib.dump
+_COMPRESSION_BUFFER_SIZE = 1024 * 1024
+
+# Called with the job ID whenever a model artifact is deleted
+_deletion_hooks: List[Callable[[str], None]] = []
+
+
+class _CountingWriter:
+    """Write-only file object passing its writes on to ``target`` and counting them."""
+
+    def __init__(self, target: Any):
+        self.target = target
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.target.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self) -> None:
+        self.target.flush()
+
+
+def _dump_compressed(model: Any, path: str, compress: Tuple[str, int]) -> int:
+    """
+    Write a compressed joblib artifact, like ``joblib.dump`` with ``compress``.
+
+    The pickle is counted on its way into the compressor, so that the size of the
+    uncompressed pickle, which approximates the loaded model, comes from the same pass.
+
+    Returns:
+        int: Size of the uncompressed pickle in bytes.
+    """
+    method, level = compress
+    with open(path, 'wb') as raw:
+        compressed = io.BufferedWriter(
+            _COMPRESSORS[method].compressor_file(raw, compresslevel=level),
+            buffer_size=_COMPRESSION_BUFFER_SIZE
+        )
+        with compressed:
+            counter = _CountingWriter(compressed)
+            joblib.dump(model, counter)
+    return counter.size
+
+
+def _compression() -> Any:
+    """The ``compress`` argument of ``joblib.dump`` for the configured compression."""
+    if not settings.MODEL_COMPRESSION:
+        return 0
+    return (settings.MODEL_COMPRESSION, settings.MODEL_COMPRESSION_LEVEL)
+
+
+def library_versions() -> Dict[str, str]:
+    """Versions of the libraries that fit and pickle the models."""
+    return {
+        "joblib": joblib.__version__,
+        "numpy": numpy.__version__,
+        "scikit-learn": sklearn.__version__
+    }
+
+
+def manifest_path(model_path: Path) -> Path:
+    """Path of the manifest describing a model artifact."""
+    return Path(model_path).with_suffix(MANIFEST_SUFFIX)
+
+
+def save_model(job_id: str, model: Any) -> Dict[str, Any]:
+    """
+    Persist a fitted model for a job together with its manifest.
+
+    Uncompressed artifacts keep numpy arrays in their own aligned blocks, so they can
+    be memory-mapped on load. With ``MODEL_COMPRESSION`` set, the artifact is
+    compressed instead and is always read into memory.
+
+    Args:
+        job_id (str): The ID of the training job.
+        model (Any): The fitted estimator.
+
+    Returns:
+        Dict[str, Any]: The manifest, holding the artifact path, its size on disk,
+        SHA-256, compression, estimated in-memory size and save time.
+    """
+    model_dir = Path(settings.MODEL_STORAGE_PATH)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    model_path = model_dir / f"{job_id}.joblib"
+    compress = _compression()
+
+    start_time = time.time()
+    fd, temp_name = tempfile.mkstemp(dir=model_dir, prefix=f"{os.getpid()}-", suffix=".joblib.tmp")
+    os.close(fd)
+    try:
+        if compress:
+            memory_size = _dump_compressed(model, temp_name, compress)
+        else:
+            joblib.dump(model, temp_name)
+        os.replace(temp_name, model_path)
+    finally:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+    save_time = time.time() - start_time
+
+    size = model_path.stat().st_size
+    if not compress:
+        memory_size = size
+
+    manifest = {
+        "job_id": job_id,
+        "path": str(model_path),
+        "format": "joblib",
+        "compression": settings.MODEL_COMPRESSION or None,
+        "compression_level": settings.MODEL_COMPRESSION_LEVEL if compress else None,
+        "mmap": not compress,
+        "size": size,
+        "memory_size": memory_size,
+        "sha256": file_sha256(model_path),
+        "save_time": save_time,
+        "created_at": datetime.utcnow().isoformat(),
+        "versions": library_versions()
+    }
+    # Publish the manifest atomically, as a killed process must not leave it truncated
+    temp_manifest = model_dir / f"{os.getpid()}-{job_id}{MANIFEST_SUFFIX}.tmp"
+    temp_manifest.write_text(json.dumps(manifest))
+    os.replace(temp_manifest, manifest_path(model_path))
+    logger.info(f"Model saved to {model_path} ({size} bytes in {save_time:.3f}s)")
+    return manifest
+
+
+def on_model_deleted(hook: Callable[[str], None]) -> None:
+    """Register a function called with the job ID of every deleted model artifact."""
+    _deletion_hooks.append(hook)
+
+
+def delete_model(job_id: str) -> bool:
+    """
+    Remove the model artifact of a job and its manifest.
+
+    Returns:
+        bool: Whether an artifact existed.
+    """
+    model_path = Path(settings.MODEL_STORAGE_PATH) / f"{job_id}.joblib"
+    existed = model_path.exists()
+    model_path.unlink(missing_ok=True)
+    manifest_path(model_path).unlink(missing_ok=True)
+    for hook in _deletion_hooks:
+        hook(job_id)
+    if existed:
+        logger.info(f"Deleted model {model_path}")
+    return existed
+
+
+def remove_partial_models(pid: int) -> int:
+    """
+    Remove the unfinished model artifacts left by a killed process.
+
+    Returns:
+        int: Number of removed files.
+    """
+    removed = 0
+    model_dir = Path(settings.MODEL_STORAGE_PATH)
+    for pattern in (f"{pid}-*.joblib.tmp", f"{pid}-*{MANIFEST_SUFFIX}.tmp"):
+        for path in model_dir.glob(pattern):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def read_manifest(model_path: Path) -> Optional[Dict[str, Any]]:
+    """Return the manifest of a model artifact, or None for artifacts saved without one."""
+    path = manifest_path(model_path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def load_model(model_path: Path, mmap: Optional[bool] = None) -> Tuple[Any, float]:
+    """
+    Load a model artifact.
+
+    Args:
+        model_path (Path): Path of the artifact.
+        mmap (Optional[bool]): Memory-map the arrays instead of reading them. Defaults
+            to ``MODEL_MMAP``; compressed artifacts are always read.
+
+    Returns:
+        Tuple[Any, float]: The estimator and the load time in seconds.
+    """
+    mmap = settings.MODEL_MMAP if mmap is None else mmap
+    manifest = read_manifest(model_path)
+    if manifest is not None and not manifest["mmap"]:
+        mmap = False
+    start_time = time.time()
+    model = joblib.load(model_path, mmap_mode="r" if mmap else None)
+    load_time = time.time() - start_time
+    logger.info(f"Model loaded from {model_path} in {load_time:.3f}s")
+    return model, load_time
+
@@ -0,0 +1,326 @@
+"""
+Module containing the on-disk dataset cache.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, Optional
+
+from .config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with Path(path).open('rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive flock on ``path`` for the duration of the block."""
+    with path.open('a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Reservation:
+    """A blob download reserved through ``DatasetCache.reserve``."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        # SHA-256 of the content, if the downloader computed it
+        self.checksum: Optional[str] = None
+
+
+class DatasetCache:
+    """
+    Content-addressed cache of downloaded dataset blobs, keyed by blob ID.
+
+    Entries are evicted least-recently-used once the total size exceeds ``max_bytes``.
+    A process that fetched a blob pins it with a shared lock until it exits, and
+    pinned entries are never evicted, so their files cannot disappear while a job
+    still has to open them. Each entry records the SHA-256 of its content, computed
+    when it is added, and the size and modification time of its file. When
+    ``verify`` is set, a hit whose file changed since then is discarded. The index and
+    per-blob download locks live on disk, so worker processes share both the cache
+    and any in-flight download of the same blob.
+    """
+
+    def __init__(self, root: str, max_bytes: int, verify: bool = True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.verify = verify
+        # Pin files of the blobs fetched by this process, holding a shared lock
+        self._pins: Dict[str, IO] = {}
+
+    @property
+    def _index_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _key(self, blob_id: str) -> str:
+        return hashlib.sha256(blob_id.encode('utf-8')).hexdigest()
+
+    def _blob_path(self, key: str) -> Path:
+        return self.root / f"{key}.blob"
+
+    def fetch(self, blob_id: str, download: Callable[[Path], Optional[str]]) -> Path:
+        """
+        Return the local path of a blob, downloading it on a cache miss.
+
+        Args:
+            blob_id (str): The decrypted blob ID.
+            download (Callable[[Path], Optional[str]]): Writes the blob content to the
+                given path. May return the SHA-256 of the content if it computed it.
+
+        Returns:
+            Path: Path of the cached blob. It stays pinned, and so in the cache, until
+            this process exits.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        key = self._key(blob_id)
+        # Only one process downloads a given blob; the others wait here and then hit
+        with _file_lock(self.root / f"{key}.lock"):
+            # Pin before the lookup, so that the entry cannot be evicted in between
+            pinned = self._pin(key)
+            try:
+                path = self._lookup(key)
+                if path is not None:
+                    logger.info(f"Dataset cache hit for blob {key[:12]}")
+                    return path
+
+                logger.info(f"Dataset cache miss for blob {key[:12]}, downloading")
+                temp_path = self._new_temp_path()
+                try:
+                    checksum = download(temp_path)
+                    return self._commit(key, temp_path, checksum)
+                finally:
+                    temp_path.unlink(missing_ok=True)
+            except BaseException:
+                if pinned:
+                    self._unpin(key)
+                raise
+
+    def _pin(self, key: str) -> bool:
+        """Take a shared lock on a blob's pin file; returns whether this call took it."""
+        if key in self._pins:
+            return False
+        pin_file = (self.root / f"{key}.pin").open('a')
+        fcntl.flock(pin_file, fcntl.LOCK_SH)
+        self._pins[key] = pin_file
+        return True
+
+    def _unpin(self, key: str) -> None:
+        pin_file = self._pins.pop(key, None)
+        if pin_file is not None:
+            pin_file.close()
+
+    def _pinned(self, key: str) -> bool:
+        """Whether any process, this one included, holds a pin on a blob."""
+        if key in self._pins:
+            return True
+        pin_path = self.root / f"{key}.pin"
+        if not pin_path.exists():
+            return False
+        with pin_path.open('a') as pin_file:
+            try:
+                fcntl.flock(pin_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(pin_file, fcntl.LOCK_UN)
+        return False
+
+    @contextmanager
+    def reserve(self, blob_id: str) -> Iterator[Optional["Reservation"]]:
+        """
+        Reserve a blob for download without blocking.
+
+        Yields None if the blob is already cached or another download of it is in
+        progress. Otherwise yields a ``Reservation`` whose ``path`` the caller writes
+        the blob to; the content is added to the cache when the block exits normally.
+
+        Args:
+            blob_id (str): The decrypted blob ID.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        key = self._key(blob_id)
+        with (self.root / f"{key}.lock").open('a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield None
+                return
+            try:
+                if self._lookup(key, verify=False) is not None:
+                    yield None
+                    return
+                reservation = Reservation(self._new_temp_path())
+                try:
+                    yield reservation
+                    self._commit(key, reservation.path, reservation.checksum)
+                finally:
+                    reservation.path.unlink(missing_ok=True)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _new_temp_path(self) -> Path:
+        # Prefixed with the PID so that the files of a killed job can be found
+        fd, temp_name = tempfile.mkstemp(dir=self.root, prefix=f"{os.getpid()}-", suffix=".part")
+        os.close(fd)
+        return Path(temp_name)
+
+    def remove_partial(self, pid: int) -> int:
+        """
+        Remove the unfinished downloads and column copies left by a killed process.
+
+        Returns:
+            int: Number of removed files and directories.
+        """
+        removed = 0
+        for path in self.root.glob(f"{pid}-*"):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def _commit(self, key: str, temp_path: Path, checksum: Optional[str]) -> Path:
+        """Move a downloaded blob into the cache and record it in the index."""
+        size = temp_path.stat().st_size
+        if size == 0:
+            raise Exception(f"Downloaded file is empty: {temp_path}")
+        checksum = checksum or file_sha256(temp_path)
+        path = self._blob_path(key)
+        os.replace(temp_path, path)
+
+        with self._index() as index:
+            index[key] = {
+                "size": size,
+                "sha256": checksum,
+                "mtime_ns": path.stat().st_mtime_ns,
+                "last_access": time.time()
+            }
+            self._evict(index, keep=key)
+        return path
+
+    def checksum(self, blob_id: str) -> Optional[str]:
+        """Return the SHA-256 of a cached blob's content, or None if it is not cached."""
+        try:
+            # The index is replaced atomically, so it can be read without the lock
+            index = json.loads(self._index_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        entry = index.get(self._key(blob_id))
+        return entry["sha256"] if entry is not None else None
+
+    def add_derived_size(self, blob_path: Path, size: int) -> None:
+        """
+        Account for files derived from a cached blob, such as its parsed columns.
+
+        Derived files must be stored next to the blob as ``<blob>.<suffix>`` so that
+        they are removed together with it on eviction.
+        """
+        key = Path(blob_path).stem
+        with self._index() as index:
+            entry = index.get(key)
+            if entry is None:
+                return
+            entry["derived_size"] = entry.get("derived_size", 0) + size
+            self._evict(index, keep=key)
+
+    def _lookup(self, key: str, verify: Optional[bool] = None) -> Optional[Path]:
+        """Return the cached path for ``key`` if present and intact, else None."""
+        with self._index() as index:
+            entry = index.get(key)
+            if entry is None:
+                return None
+            path = self._blob_path(key)
+            if not path.exists() or path.stat().st_size != entry["size"]:
+                logger.warning(f"Dropping incomplete cache entry {key[:12]}")
+                self._remove(index, key)
+                return None
+            entry["last_access"] = time.time()
+            verify = self.verify if verify is None else verify
+            if not verify or path.stat().st_mtime_ns == entry.get("mtime_ns"):
+                return path
+            checksum = entry["sha256"]
+        # The file changed since it was added, or predates recorded modification
+        # times: hash it once and keep it only if the content is the same
+        if file_sha256(path) != checksum:
+            logger.warning(f"Checksum mismatch for cache entry {key[:12]}, discarding")
+            with self._index() as index:
+                self._remove(index, key)
+            return None
+        with self._index() as index:
+            if key in index:
+                index[key]["mtime_ns"] = path.stat().st_mtime_ns
+        return path
+
+    @contextmanager
+    def _index(self) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """Load the index under a lock and write it back when the block exits."""
+        with _file_lock(self.root / "index.lock"):
+            try:
+                index = json.loads(self._index_path.read_text())
+            except (FileNotFoundError, ValueError):
+                index = {}
+            yield index
+            temp_path = self._index_path.with_suffix(".tmp")
+            temp_path.write_text(json.dumps(index))
+            os.replace(temp_path, self._index_path)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep: str) -> None:
+        """
+        Drop least-recently-used entries until the cache fits in ``max_bytes``,
+        skipping entries pinned by running jobs.
+        """
+        total = sum(self._entry_size(entry) for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep or self._pinned(key):
+                continue
+            total -= self._entry_size(index[key])
+            logger.info(f"Evicting cache entry {key[:12]}")
+            self._remove(index, key)
+
+    @staticmethod
+    def _entry_size(entry: Dict[str, Any]) -> int:
+        return entry["size"] + entry.get("derived_size", 0)
+
+    def _remove(self, index: Dict[str, Dict[str, Any]], key: str) -> None:
+        index.pop(key, None)
+        for path in self.root.glob(f"{key}.*"):
+            # Lock files must outlive the entry, or lockers would lock different files
+            if path.suffix in (".lock", ".pin"):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+
+dataset_cache = DatasetCache(
+    root=settings.DATASET_CACHE_PATH,
+    max_bytes=settings.DATASET_CACHE_MAX_BYTES,
+    verify=settings.DATASET_CACHE_VERIFY
+)
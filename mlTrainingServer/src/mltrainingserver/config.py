@@ -1,8 +1,9 @@
 """
 Module containing configuration settings.
 """
+import os
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """Application settings."""
@@ -21,10 +22,67 @@ class Settings(BaseSettings):
     
     # Training settings
     MAX_TRAINING_JOBS: int = 100
+    MAX_BATCH_SIZE: int = 1000  # Maximum number of jobs in one /train/batch request
     TRAINING_TIMEOUT: int = 3600  # 1 hour in seconds
+    TRAINING_WORKERS: int = os.cpu_count() or 1  # Concurrent training processes
+    TRAINING_START_METHOD: Optional[str] = "forkserver"  # multiprocessing start method
+    THREADS_PER_JOB: Optional[int] = None  # Defaults to CPU count / TRAINING_WORKERS
+    SWEEP_WORKERS: Optional[int] = None  # Parallel fits per sweep, defaults to THREADS_PER_JOB
+    SWEEP_MAX_CANDIDATES: int = 1000
+    INCREMENTAL_CHUNK_ROWS: int = 50_000  # Rows held in memory at once by incremental training
+    PREEMPTION_ENABLED: bool = True  # Queued jobs stop running jobs of lower priority when no worker is free
+
+    # Distributed execution settings
+    EXECUTION_BACKEND: str = "local"  # "local" worker pool in the API process, or "queue" for separate workers
+    QUEUE_PATH: str = "queue.db"  # SQLite job queue shared by the API and the workers
+    QUEUE_LEASE_SECONDS: float = 30.0  # A job is reassigned when its worker misses heartbeats this long
+    QUEUE_HEARTBEAT_SECONDS: float = 5.0  # Lease renewal interval of running jobs
+    QUEUE_POLL_SECONDS: float = 1.0  # Idle worker and API monitor polling interval
+    QUEUE_MAX_ATTEMPTS: int = 3  # Leases of a job before it is failed
     
     # Storage settings
     MODEL_STORAGE_PATH: str = "models"
+    MODEL_COMPRESSION: Optional[str] = None  # joblib compressor ("zlib", "gzip", "bz2", "xz", "lz4"); None keeps artifacts mmap-able
+    MODEL_COMPRESSION_LEVEL: int = 3
+    MODEL_MMAP: bool = True  # Memory-map the arrays of uncompressed artifacts on load
+    MODEL_DOWNLOAD_GZIP: bool = True  # Gzip uncompressed models for clients accepting it
+    MODEL_DOWNLOAD_GZIP_LEVEL: int = 6
+    JOB_STORE_BACKEND: str = "sqlite"  # "sqlite" or "memory"
+    JOB_STORE_PATH: str = "jobs.db"
+    JOB_TTL_SECONDS: int = 7 * 24 * 3600  # Finished jobs are removed after this long
+    JOB_COMPACTION_INTERVAL: int = 3600  # Seconds between job store compactions
+    DATASET_CACHE_PATH: str = "datasets/cache"
+    DATASET_CACHE_MAX_BYTES: int = 10 * 1024 ** 3  # 10 GiB
+    DATASET_CACHE_VERIFY: bool = True  # Discard cache hits whose file changed since it was added
+
+    # Event stream settings
+    EVENT_KEEPALIVE_SECONDS: float = 15.0  # Idle time before a keepalive and job store resync
+    EVENT_QUEUE_SIZE: int = 1000  # Updates buffered per streaming client
+
+    # Serving settings
+    MODEL_CACHE_MAX_BYTES: int = 2 * 1024 ** 3  # 2 GiB of deserialized models kept for /predict
+    PREDICT_MAX_BATCH_ROWS: int = 4096  # Rows predicted in one vectorized call
+    PREDICT_BATCH_WAIT_MS: float = 5.0  # Time a request waits for others to batch with
+    PREDICT_WARMUP_JOB_IDS: List[str] = []  # Models loaded into the cache on startup
+
+    # Health settings
+    HEALTH_MIN_FREE_BYTES: int = 1024 ** 3  # 1 GiB free under MODEL_STORAGE_PATH for /health to pass
+    
+    # Download settings
+    AGGREGATOR_URL: str = "https://aggregator.walrus-testnet.walrus.space"
+    AGGREGATOR_CONNECT_TIMEOUT: float = 10.0
+    AGGREGATOR_READ_TIMEOUT: float = 60.0
+    AGGREGATOR_MAX_RETRIES: int = 5
+    AGGREGATOR_BACKOFF_FACTOR: float = 0.5  # Retry delays are factor * 2 ** (attempt - 1)
+    AGGREGATOR_POOL_SIZE: int = 16  # Keep-alive connections kept per host
+    BLOB_ID_CACHE_SIZE: int = 4096  # Memoized encrypted-to-plaintext blob IDs
+    DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024  # Network read and CSV parser buffer size
+    PARSE_CHUNK_ROWS: int = 100_000  # Rows per incremental CSV parse chunk
+    DATASET_DOWNCAST_FLOATS: bool = True  # Store float64 columns as float32 when all their values are exactly representable
+    RANGED_DOWNLOAD_CONNECTIONS: int = 4  # Concurrent Range requests for large blobs
+    RANGED_DOWNLOAD_MIN_BYTES: int = 64 * 1024 ** 2  # Smaller blobs use a single stream
+    PREFETCH_ENABLED: bool = True  # Download datasets of queued jobs ahead of time
+    PREFETCH_CONCURRENCY: int = 4  # Concurrent prefetch downloads on the event loop
     
     class Config:
         case_sensitive = True
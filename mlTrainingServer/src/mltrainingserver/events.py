@@ -0,0 +1,96 @@
+"""
+Module for publishing job updates to streaming clients.
+"""
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from .config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Queue of job updates delivered to one client on its event loop.
+
+    When the client falls behind and the queue is full, further updates are dropped
+    and ``lagged`` is set, so the client can re-read the jobs from the job store.
+    """
+
+    def __init__(self, job_ids: Optional[Iterable[str]], loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.job_ids = set(job_ids) if job_ids is not None else None
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.lagged = False
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        if self.queue.full():
+            self.lagged = True
+        else:
+            self.queue.put_nowait(event)
+
+
+class JobEventBus:
+    """
+    Fans job updates out to subscribed clients.
+
+    Updates are published from scheduler threads and handed to each subscriber's
+    event loop, so publishing never blocks on a slow client.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._by_job: Dict[str, Set[Subscription]] = {}
+        self._all: Set[Subscription] = set()
+
+    def publish(self, job_id: str, fields: Dict[str, Any]) -> None:
+        """Send an update of a job to the clients following it."""
+        with self._lock:
+            subscribers = list(self._by_job.get(job_id, ())) + list(self._all)
+        if not subscribers:
+            return
+        event = {"job_id": job_id, **fields}
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                self._remove(subscription)
+
+    @contextmanager
+    def subscribe(self, job_ids: Optional[Iterable[str]] = None) -> Iterator[Subscription]:
+        """
+        Follow the updates of some jobs, or of all jobs when ``job_ids`` is None.
+
+        Must be called from the event loop that consumes the subscription's queue.
+        """
+        subscription = Subscription(job_ids, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            if subscription.job_ids is None:
+                self._all.add(subscription)
+            else:
+                for job_id in subscription.job_ids:
+                    self._by_job.setdefault(job_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._all.discard(subscription)
+            for job_id in subscription.job_ids or ():
+                subscribers = self._by_job.get(job_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_job[job_id]
+
+
+job_events = JobEventBus(max_queue=settings.EVENT_QUEUE_SIZE)
@@ -11,12 +11,24 @@ from Crypto.Util.Padding import unpad
 import tempfile
 import shutil
 import os
+import io
+import queue
+import threading
+import functools
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+
+from .aggregator import aggregator_client, async_aggregator_client
+from .cache import dataset_cache
+from .config import settings
+from .loader import downcast
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-AGGREGATOR_URL = "https://aggregator.walrus-testnet.walrus.space"
+# Number of downloaded chunks buffered ahead of the CSV parser
+_STREAM_QUEUE_DEPTH = 16
 
 def _openssl_kdf(passphrase: bytes, salt: bytes, key_len: int = 32, iv_len: int = 16):
     """
@@ -52,47 +64,76 @@ def decrypt_blob_id(ciphertext_b64: str, passphrase: str) -> str:
         logger.error(f"Failed to decrypt blob ID: {str(e)}")
         raise Exception(f"Decryption failed: {str(e)}")
 
-def download_dataset(encrypted_blob_id: str, jwt_secret: str, output_file: str) -> None:
+@functools.lru_cache(maxsize=16)
+def _derive_jwt_key(jwt_secret: str) -> str:
+    """Derive the CryptoJS passphrase from a JWT secret (the hex SHA-256 of the secret)."""
+    return hashlib.sha256(jwt_secret.encode('utf-8')).hexdigest()
+
+@functools.lru_cache(maxsize=settings.BLOB_ID_CACHE_SIZE)
+def _resolve_blob_id_cached(encrypted_blob_id: str, jwt_secret: str) -> str:
+    return decrypt_blob_id(encrypted_blob_id, _derive_jwt_key(jwt_secret))
+
+def resolve_blob_id(encrypted_blob_id: str, jwt_secret: str) -> str:
     """
-    Download a dataset using requests.
+    Decrypt an encrypted blob ID using the key derived from the JWT secret.
+    
+    Results are memoized per ciphertext within a process. The API resolves blob IDs
+    when jobs are submitted and passes the plaintext to the job processes, so repeated
+    submissions on the same dataset skip the key derivation and AES decryption.
     
     Args:
-        encrypted_blob_id (str): The encrypted blob ID of the dataset to download.
+        encrypted_blob_id (str): The encrypted blob ID of the dataset.
         jwt_secret (str): The JWT secret used to decrypt the blob ID.
-        output_file (str): The name of the file to save the dataset to.
+    
+    Returns:
+        str: The plaintext blob ID.
+    """
+    return _resolve_blob_id_cached(encrypted_blob_id, jwt_secret)
+
+def resolve_blob_ids(encrypted_blob_ids: List[str], jwt_secret: str) -> Dict[str, Optional[str]]:
+    """
+    Decrypt many encrypted blob IDs at once, e.g. for a batch of job submissions.
+    
+    Each distinct ciphertext is decrypted once.
+    
+    Args:
+        encrypted_blob_ids (List[str]): The encrypted blob IDs.
+        jwt_secret (str): The JWT secret used to decrypt the blob IDs.
+    
+    Returns:
+        Dict[str, Optional[str]]: Plaintext blob ID per encrypted blob ID, or None
+        where decryption failed.
+    """
+    resolved: Dict[str, Optional[str]] = {}
+    for encrypted_blob_id in dict.fromkeys(encrypted_blob_ids):
+        try:
+            resolved[encrypted_blob_id] = resolve_blob_id(encrypted_blob_id, jwt_secret)
+        except Exception as e:
+            logger.error(f"Failed to resolve blob ID: {str(e)}")
+            resolved[encrypted_blob_id] = None
+    return resolved
+
+def download_blob(blob_id: str, output_file: str) -> None:
+    """
+    Download a blob from the aggregator.
+    
+    Args:
+        blob_id (str): The plaintext blob ID to download.
+        output_file (str): The name of the file to save the blob to.
     """
     temp_file = None
     temp_path = None
     try:
-        # Decrypt the blob ID
-        logger.info("Generating JWT key from secret")
-        jwt_key = hashlib.sha256(jwt_secret.encode('utf-8')).hexdigest()
-        logger.info("Decrypting blob ID")
-        blob_id = decrypt_blob_id(encrypted_blob_id, jwt_key)
-        logger.info(f"Decrypted blob ID: {blob_id}")
-        
         # Download the dataset
-        url = f"{AGGREGATOR_URL}/v1/blobs/{blob_id}"
-        logger.info(f"Downloading from {url}")
+        logger.info("Downloading blob from aggregator")
         
         # Create a temporary file for downloading
         temp_file = tempfile.NamedTemporaryFile(delete=False)
         temp_path = Path(temp_file.name)
         temp_file.close()  # Close the file handle before writing
         
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        # Get content length if available
-        content_length = response.headers.get('content-length')
-        if content_length:
-            logger.info(f"Content length: {content_length} bytes")
-        
         # Download to temporary file
-        with temp_path.open('wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        aggregator_client.download_blob(blob_id, str(temp_path), settings.DOWNLOAD_CHUNK_SIZE)
         
         # Verify the temporary file was created and has content
         if not temp_path.exists():
@@ -121,7 +162,7 @@ def download_dataset(encrypted_blob_id: str, jwt_secret: str, output_file: str)
         
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to download dataset: {str(e)}")
-        if hasattr(e.response, 'text'):
+        if getattr(e.response, 'text', None):
             logger.error(f"Response text: {e.response.text}")
         raise
     except Exception as e:
@@ -136,6 +177,234 @@ def download_dataset(encrypted_blob_id: str, jwt_secret: str, output_file: str)
             except Exception as e:
                 logger.error(f"Failed to clean up temporary file: {str(e)}")
 
+class _ChunkStream(io.RawIOBase):
+    """Readable file object over byte chunks handed over by a download thread."""
+
+    def __init__(self, chunks: queue.Queue):
+        self._chunks = chunks
+        self._buffer = memoryview(b'')
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._eof:
+            item = self._chunks.get()
+            if isinstance(item, BaseException):
+                raise item
+            if item is None:
+                self._eof = True
+            else:
+                self._buffer = memoryview(item)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+def _pump_blob(blob_chunks: Iterator[bytes], sink_path: Path, chunks: queue.Queue,
+               stop: threading.Event) -> None:
+    """Write the blob content to the sink file and hand each chunk to the parser."""
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with sink_path.open('wb') as f:
+            for chunk in blob_chunks:
+                f.write(chunk)
+                if not put(chunk):
+                    return
+        put(None)
+    except BaseException as e:
+        put(e)
+    finally:
+        blob_chunks.close()
+
+def stream_parse_blob(blob_id: str, sink_path: str, chunk_size: Optional[int] = None,
+                      chunk_rows: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Download a CSV blob and parse it while it is still downloading.
+    
+    The response body is written to ``sink_path`` and, at the same time, fed to a
+    chunked CSV parser, so parsing overlaps the download instead of following it.
+    Each chunk is downcast before the next one is parsed, which keeps the peak memory
+    of wide numeric datasets low.
+    
+    Args:
+        blob_id (str): The plaintext blob ID to download.
+        sink_path (str): File that receives the raw blob content, e.g. a cache entry.
+        chunk_size (Optional[int]): Network read and parser buffer size in bytes.
+            Defaults to ``settings.DOWNLOAD_CHUNK_SIZE``.
+        chunk_rows (Optional[int]): Rows parsed per CSV chunk. Defaults to
+            ``settings.PARSE_CHUNK_ROWS``.
+        columns (Optional[List[str]]): Columns to parse; the whole blob is still
+            written to ``sink_path``. Defaults to all columns.
+    
+    Returns:
+        pd.DataFrame: The parsed dataset.
+    """
+    chunk_size = chunk_size or settings.DOWNLOAD_CHUNK_SIZE
+    chunk_rows = chunk_rows or settings.PARSE_CHUNK_ROWS
+    logger.info("Streaming blob from aggregator")
+    
+    chunks: queue.Queue = queue.Queue(maxsize=_STREAM_QUEUE_DEPTH)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_pump_blob,
+        args=(aggregator_client.iter_blob(blob_id, chunk_size), Path(sink_path), chunks, stop),
+        daemon=True
+    )
+    producer.start()
+    try:
+        reader = io.BufferedReader(_ChunkStream(chunks), buffer_size=chunk_size)
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda name: name in wanted
+        frames = [downcast(chunk) for chunk in pd.read_csv(reader, chunksize=chunk_rows, usecols=usecols)]
+        # The parser has seen EOF, so the sink file is complete
+        producer.join()
+        if not frames:
+            raise Exception("Dataset is empty after loading")
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        logger.info(f"Streamed and parsed {len(df)} rows from blob")
+        return df
+    finally:
+        stop.set()
+        producer.join()
+
+def download_dataset(encrypted_blob_id: str, jwt_secret: str, output_file: str) -> None:
+    """
+    Download a dataset using requests.
+    
+    Args:
+        encrypted_blob_id (str): The encrypted blob ID of the dataset to download.
+        jwt_secret (str): The JWT secret used to decrypt the blob ID.
+        output_file (str): The name of the file to save the dataset to.
+    """
+    blob_id = resolve_blob_id(encrypted_blob_id, jwt_secret)
+    download_blob(blob_id, output_file)
+
+def fetch_dataset(encrypted_blob_id: str, jwt_secret: str) -> Path:
+    """
+    Return a local path for a dataset, downloading it only on a cache miss.
+    
+    Args:
+        encrypted_blob_id (str): The encrypted blob ID of the dataset.
+        jwt_secret (str): The JWT secret used to decrypt the blob ID.
+    
+    Returns:
+        Path: Path of the cached dataset file. The file is owned by the cache and
+        must not be modified or deleted by the caller.
+    """
+    return fetch_blob(resolve_blob_id(encrypted_blob_id, jwt_secret))
+
+def fetch_blob(blob_id: str) -> Path:
+    """
+    Like ``fetch_dataset``, for an already decrypted blob ID.
+    
+    Args:
+        blob_id (str): The plaintext blob ID of the dataset.
+    
+    Returns:
+        Path: Path of the cached dataset file.
+    """
+    return dataset_cache.fetch(blob_id, lambda path: download_blob(blob_id, str(path)))
+
+def fetch_and_parse_dataset(encrypted_blob_id: str, jwt_secret: str,
+                            columns: Optional[List[str]] = None) -> Tuple[Path, Optional[pd.DataFrame]]:
+    """
+    Like ``fetch_dataset``, but on a cache miss also parse the CSV while downloading it.
+    
+    Args:
+        encrypted_blob_id (str): The encrypted blob ID of the dataset.
+        jwt_secret (str): The JWT secret used to decrypt the blob ID.
+        columns (Optional[List[str]]): Columns to parse while downloading. Defaults
+            to all columns.
+    
+    Returns:
+        Tuple[Path, Optional[pd.DataFrame]]: Path of the cached dataset file, and the
+        parsed dataset if it was downloaded by this call (None on a cache hit).
+    """
+    return fetch_and_parse_blob(resolve_blob_id(encrypted_blob_id, jwt_secret), columns)
+
+def fetch_and_parse_blob(blob_id: str,
+                         columns: Optional[List[str]] = None) -> Tuple[Path, Optional[pd.DataFrame]]:
+    """
+    Like ``fetch_and_parse_dataset``, for an already decrypted blob ID.
+    
+    Args:
+        blob_id (str): The plaintext blob ID of the dataset.
+        columns (Optional[List[str]]): Columns to parse while downloading. Defaults
+            to all columns.
+    
+    Returns:
+        Tuple[Path, Optional[pd.DataFrame]]: Path of the cached dataset file, and the
+        parsed dataset if it was downloaded by this call (None on a cache hit).
+    """
+    parsed: Dict[str, pd.DataFrame] = {}
+    
+    def download(path: Path) -> Optional[str]:
+        # Large blobs are bound by single-stream throughput, so fetch them over
+        # several connections and parse afterwards
+        if settings.RANGED_DOWNLOAD_CONNECTIONS > 1:
+            size, ranged = aggregator_client.probe(blob_id)
+            if ranged and size is not None and size >= settings.RANGED_DOWNLOAD_MIN_BYTES:
+                return aggregator_client.download_blob_ranged(
+                    blob_id, str(path), size,
+                    connections=settings.RANGED_DOWNLOAD_CONNECTIONS,
+                    chunk_size=settings.DOWNLOAD_CHUNK_SIZE
+                )
+        parsed["df"] = stream_parse_blob(blob_id, str(path), columns=columns)
+        return None
+    
+    path = dataset_cache.fetch(blob_id, download)
+    return path, parsed.get("df")
+
+async def download_dataset_async(encrypted_blob_id: str, jwt_secret: str, output_file: str) -> None:
+    """
+    Download a dataset without blocking the event loop.
+    
+    Args:
+        encrypted_blob_id (str): The encrypted blob ID of the dataset to download.
+        jwt_secret (str): The JWT secret used to decrypt the blob ID.
+        output_file (str): The name of the file to save the dataset to.
+    """
+    blob_id = resolve_blob_id(encrypted_blob_id, jwt_secret)
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    await async_aggregator_client.download_blob(blob_id, str(output_path), settings.DOWNLOAD_CHUNK_SIZE)
+    logger.info(f"Downloaded dataset to {output_path}")
+
+async def prefetch_dataset_async(encrypted_blob_id: str, jwt_secret: str) -> bool:
+    """
+    Download a dataset into the cache ahead of the job that needs it.
+    
+    Does nothing if the dataset is already cached or being downloaded by someone else.
+    
+    Args:
+        encrypted_blob_id (str): The encrypted blob ID of the dataset.
+        jwt_secret (str): The JWT secret used to decrypt the blob ID.
+    
+    Returns:
+        bool: Whether this call downloaded the dataset.
+    """
+    blob_id = resolve_blob_id(encrypted_blob_id, jwt_secret)
+    with dataset_cache.reserve(blob_id) as reservation:
+        if reservation is None:
+            return False
+        logger.info("Prefetching dataset into cache")
+        reservation.checksum = await async_aggregator_client.download_blob(
+            blob_id, str(reservation.path), settings.DOWNLOAD_CHUNK_SIZE
+        )
+    return True
+
 if __name__ == "__main__":
     # Example usage
     encrypted_blob_id = "U2FsdGVkX1+b4DRNpbrtDpkJid8126xTdyD4DcHas5lBw4o6FVVVa/8yomldQcYYnrDygNHiHxHs91NCjRotoQ=="
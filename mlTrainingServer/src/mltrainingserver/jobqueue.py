@@ -0,0 +1,406 @@
+"""
+Module containing the durable job queue shared by the API and the training workers.
+"""
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How long a worker that stopped heartbeating stays in the registry
+WORKER_RETENTION_SECONDS = 600
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot accept another job."""
+
+
+def target_name(target: Callable) -> str:
+    """Name under which a job function is stored in the queue."""
+    return f"{target.__module__}:{target.__qualname__}"
+
+
+def resolve_target(name: str) -> Callable:
+    """
+    Import the job function stored in the queue under ``name``.
+
+    Raises:
+        ValueError: If the function is not part of the service.
+    """
+    module_name, _, qualname = name.partition(":")
+    if module_name.split(".")[0] != __package__:
+        raise ValueError(f"Refusing to run {name}: not a function of {__package__}")
+    target: Any = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+        target = getattr(target, attribute)
+    return target
+
+
+class SQLiteJobQueue:
+    """
+    Priority queue of training jobs in an SQLite database in WAL mode.
+
+    Workers lease the highest-priority job and must renew the lease by heartbeat
+    before it expires. Expired leases are reclaimed by any worker or by the API: the
+    job is queued again, or abandoned once it has been leased ``max_attempts`` times.
+    Every lease carries a fresh token, so a worker that lost its lease can no longer
+    renew or finish the job. Finished jobs stay in the queue until the API has
+    collected them, so that it can account for jobs run by other processes.
+    """
+
+    _TABLES = (
+        """
+        CREATE TABLE IF NOT EXISTS queue (
+            job_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            priority INTEGER NOT NULL,
+            target TEXT NOT NULL,
+            kwargs TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            lease_token TEXT,
+            leased_at REAL,
+            lease_expires REAL,
+            stop TEXT,
+            enqueued_at REAL NOT NULL,
+            finished_at REAL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            host TEXT,
+            pid INTEGER,
+            started_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL,
+            job_id TEXT,
+            busy_seconds REAL NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_queue_order ON queue (state, priority DESC, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_queue_lease ON queue (state, lease_expires)",
+    )
+    # Columns added to the queue table after its first version, created on older databases
+    _ADDED_COLUMNS = {"stop": "TEXT"}
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            for statement in self._TABLES:
+                conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(queue)")}
+            for column, column_type in self._ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE queue ADD COLUMN {column} {column_type}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue_many(self, jobs: List[Tuple[str, str, Dict[str, Any], int]], max_jobs: int) -> List[int]:
+        """
+        Queue several ``(job_id, target_name, kwargs, priority)`` jobs at once.
+
+        Either all jobs are queued or, when queued and leased jobs would exceed
+        ``max_jobs``, none is.
+
+        Returns:
+            List[int]: The 1-based queue position of each job.
+
+        Raises:
+            QueueFullError: If the jobs do not all fit.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            active = conn.execute("SELECT COUNT(*) FROM queue WHERE state != 'done'").fetchone()[0]
+            if active + len(jobs) > max_jobs:
+                raise QueueFullError(f"Training queue is full ({max_jobs} jobs queued or running)")
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM queue").fetchone()[0]
+            for job_id, target, kwargs, priority in jobs:
+                seq += 1
+                conn.execute(
+                    "INSERT INTO queue (job_id, seq, priority, target, kwargs, state, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                    (job_id, seq, priority, target, json.dumps(kwargs), now)
+                )
+            return [self._position(conn, job_id) for job_id, _, _, _ in jobs]
+
+    @staticmethod
+    def _position(conn: sqlite3.Connection, job_id: str) -> Optional[int]:
+        row = conn.execute("SELECT priority, seq FROM queue WHERE job_id = ? AND state = 'queued'",
+                           (job_id,)).fetchone()
+        if row is None:
+            return None
+        priority, seq = row
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE state = 'queued' AND (priority > ? OR (priority = ? AND seq < ?))",
+            (priority, priority, seq)
+        ).fetchone()[0]
+        return ahead + 1
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Return the 1-based queue position of a queued job, or None if it is not queued."""
+        return self._position(self._connection(), job_id)
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next queued job to a worker.
+
+        Returns:
+            Optional[Dict[str, Any]]: ``job_id``, ``token``, ``target``, ``kwargs`` and
+            ``attempt`` of the leased job, or None if the queue is empty.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, target, kwargs, attempts FROM queue WHERE state = 'queued' "
+                "ORDER BY priority DESC, seq LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, target, kwargs, attempts = row
+            conn.execute(
+                "UPDATE queue SET state = 'leased', attempts = ?, worker_id = ?, lease_token = ?, "
+                "leased_at = ?, lease_expires = ?, stop = NULL WHERE job_id = ?",
+                (attempts + 1, worker_id, token, now, now + lease_seconds, job_id)
+            )
+            conn.execute("UPDATE workers SET job_id = ?, heartbeat_at = ? WHERE worker_id = ?",
+                         (job_id, now, worker_id))
+        return {"job_id": job_id, "token": token, "target": target, "kwargs": json.loads(kwargs),
+                "attempt": attempts + 1}
+
+    def heartbeat(self, job_id: str, token: str, lease_seconds: float) -> Tuple[bool, Optional[str]]:
+        """
+        Renew a lease.
+
+        Returns:
+            Tuple[bool, Optional[str]]: Whether the lease was still held, False meaning
+            the job was reclaimed, and the stop requested for the job: ``"cancel"``,
+            ``"preempt"`` or None.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE queue SET lease_expires = ? WHERE job_id = ? AND lease_token = ? AND state = 'leased'",
+                (now + lease_seconds, job_id, token)
+            )
+            if cursor.rowcount != 1:
+                return False, None
+            conn.execute("UPDATE workers SET heartbeat_at = ? WHERE job_id = ?", (now, job_id))
+            row = conn.execute("SELECT stop FROM queue WHERE job_id = ?", (job_id,)).fetchone()
+            return True, row[0]
+
+    def complete(self, job_id: str, token: str) -> bool:
+        """
+        Mark a leased job as finished.
+
+        Returns:
+            bool: Whether the lease was still held.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT worker_id, leased_at FROM queue WHERE job_id = ? AND lease_token = ? AND state = 'leased'",
+                (job_id, token)
+            ).fetchone()
+            if row is None:
+                return False
+            worker_id, leased_at = row
+            conn.execute("UPDATE queue SET state = 'done', lease_token = NULL, finished_at = ? WHERE job_id = ?",
+                         (now, job_id))
+            conn.execute(
+                "UPDATE workers SET job_id = NULL, heartbeat_at = ?, busy_seconds = busy_seconds + ? "
+                "WHERE worker_id = ?",
+                (now, now - leased_at, worker_id)
+            )
+            return True
+
+    def release(self, job_id: str, token: str) -> bool:
+        """
+        Give a leased job back to the queue without counting the attempt, when its
+        worker shuts down or the job is preempted. It keeps its place in the queue.
+
+        Returns:
+            bool: Whether the lease was still held.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE queue SET state = 'queued', attempts = attempts - 1, worker_id = NULL, "
+                "lease_token = NULL, leased_at = NULL, lease_expires = NULL, stop = NULL "
+                "WHERE job_id = ? AND lease_token = ? AND state = 'leased'",
+                (job_id, token)
+            )
+            conn.execute("UPDATE workers SET job_id = NULL WHERE job_id = ?", (job_id,))
+            return cursor.rowcount == 1
+
+    def reclaim_expired(self) -> Tuple[List[str], List[str]]:
+        """
+        Take back the jobs whose lease expired.
+
+        Returns:
+            Tuple[List[str], List[str]]: The jobs queued again, and the jobs abandoned
+            after ``max_attempts`` leases or cancelled, which the caller must fail
+            unless they are cancelled.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT job_id, attempts, stop FROM queue WHERE state = 'leased' AND lease_expires < ?", (now,)
+            ).fetchall()
+            requeued = [
+                job_id for job_id, attempts, stop in rows if attempts < self.max_attempts and stop != "cancel"
+            ]
+            abandoned = [job_id for job_id, attempts, stop in rows if job_id not in requeued]
+            for job_id in requeued:
+                conn.execute(
+                    "UPDATE queue SET state = 'queued', worker_id = NULL, lease_token = NULL, leased_at = NULL, "
+                    "lease_expires = NULL, stop = NULL WHERE job_id = ?",
+                    (job_id,)
+                )
+            for job_id in abandoned:
+                conn.execute("UPDATE queue SET state = 'done', lease_token = NULL, finished_at = ? WHERE job_id = ?",
+                             (now, job_id))
+            for job_id, _, _ in rows:
+                conn.execute("UPDATE workers SET job_id = NULL WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - WORKER_RETENTION_SECONDS,))
+        for job_id in requeued:
+            logger.warning(f"Lease of job {job_id} expired, queueing it again")
+        for job_id in abandoned:
+            logger.error(f"Lease of job {job_id} expired, abandoning it")
+        return requeued, abandoned
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove a queued job, or ask the worker running it to kill it at its next heartbeat.
+
+        Returns:
+            bool: Whether the job was queued or running.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM queue WHERE job_id = ? AND state = 'queued'", (job_id,))
+            if cursor.rowcount == 1:
+                return True
+            cursor = conn.execute("UPDATE queue SET stop = 'cancel' WHERE job_id = ? AND state = 'leased'",
+                                  (job_id,))
+            return cursor.rowcount == 1
+
+    def preempt(self, alive_seconds: float) -> List[str]:
+        """
+        Ask the workers of low-priority jobs to give them back to the queue, when queued
+        jobs of higher priority are left without an idle worker.
+
+        Idle workers are the live ones (heartbeat within ``alive_seconds``) without a
+        job. Jobs already asked to stop count as idle workers.
+
+        Returns:
+            List[str]: The jobs asked to give way.
+        """
+        now = time.time()
+        preempted = []
+        with self._transaction() as conn:
+            idle = conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE job_id IS NULL AND heartbeat_at >= ?", (now - alive_seconds,)
+            ).fetchone()[0]
+            idle += conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE state = 'leased' AND stop IS NOT NULL"
+            ).fetchone()[0]
+            waiting = conn.execute(
+                "SELECT job_id, priority FROM queue WHERE state = 'queued' "
+                "ORDER BY priority DESC, seq LIMIT -1 OFFSET ?",
+                (idle,)
+            ).fetchall()
+            victims = conn.execute(
+                "SELECT job_id, priority FROM queue WHERE state = 'leased' AND stop IS NULL "
+                "ORDER BY priority, seq DESC"
+            ).fetchall()
+            for (queued_id, queued_priority), (victim_id, victim_priority) in zip(waiting, victims):
+                if queued_priority <= victim_priority:
+                    break
+                conn.execute("UPDATE queue SET stop = 'preempt' WHERE job_id = ?", (victim_id,))
+                logger.info(f"Preempting job {victim_id} (priority {victim_priority}) "
+                            f"for job {queued_id} (priority {queued_priority})")
+                preempted.append(victim_id)
+        return preempted
+
+    def collect_finished(self, limit: int = 100) -> List[str]:
+        """Remove finished jobs from the queue and return their IDs."""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT job_id FROM queue WHERE state = 'done' ORDER BY finished_at LIMIT ?",
+                                (limit,)).fetchall()
+            job_ids = [row[0] for row in rows]
+            conn.executemany("DELETE FROM queue WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+        return job_ids
+
+    def register_worker(self, worker_id: str, host: str, pid: int) -> None:
+        """Add a worker to the registry."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)",
+                (worker_id, host, pid, now, now)
+            )
+
+    def worker_heartbeat(self, worker_id: str) -> None:
+        """Record that an idle worker is alive."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE workers SET heartbeat_at = ? WHERE worker_id = ?", (time.time(), worker_id))
+
+    def unregister_worker(self, worker_id: str) -> None:
+        """Remove a worker that shuts down cleanly from the registry."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def stats(self, alive_seconds: float) -> Dict[str, Any]:
+        """
+        Return the queue depth and the registered workers.
+
+        Workers that have not heartbeat within ``alive_seconds`` count as dead, and are
+        dropped from the registry after ``WORKER_RETENTION_SECONDS``.
+        ``lease_ages`` lists how long each leased job has been running.
+        """
+        now = time.time()
+        conn = self._connection()
+        states = dict(conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state").fetchall())
+        workers = conn.execute("SELECT heartbeat_at, busy_seconds FROM workers").fetchall()
+        leases = conn.execute("SELECT leased_at FROM queue WHERE state = 'leased'").fetchall()
+        return {
+            "queued": states.get("queued", 0),
+            "leased": states.get("leased", 0),
+            "workers": len(workers),
+            "workers_alive": sum(heartbeat_at >= now - alive_seconds for heartbeat_at, _ in workers),
+            "busy_seconds": sum(busy for _, busy in workers) + sum(now - row[0] for row in leases),
+            "lease_ages": [now - row[0] for row in leases]
+        }
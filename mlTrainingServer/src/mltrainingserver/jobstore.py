@@ -0,0 +1,354 @@
+"""
+Module containing the job store backends.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import TrainingStatus
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuses after which a job no longer changes
+TERMINAL_STATUSES = (TrainingStatus.COMPLETE, TrainingStatus.FAILED, TrainingStatus.CANCELLED)
+
+
+class JobStore(ABC):
+    """Interface of a job store. Jobs are JSON-serializable dicts keyed by ``job_id``."""
+
+    @abstractmethod
+    def create(self, job: Dict[str, Any]) -> None:
+        """Insert a new job."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a job, or None if it does not exist."""
+
+    @abstractmethod
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        """Merge ``fields`` into a job, creating it if it does not exist."""
+
+    @abstractmethod
+    def transition(self, job_id: str, from_statuses: Iterable[str], fields: Dict[str, Any]) -> bool:
+        """
+        Atomically merge ``fields`` into a job if its status is one of ``from_statuses``.
+
+        Returns:
+            bool: Whether the job was updated.
+        """
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """Remove a job."""
+
+    @abstractmethod
+    def query(self, statuses: Optional[Iterable[str]] = None, created_after: Optional[str] = None,
+              created_before: Optional[str] = None, after: Optional[Tuple[str, str]] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Return jobs ordered by creation time and job ID.
+
+        Args:
+            statuses (Optional[Iterable[str]]): Only return jobs with one of these statuses.
+            created_after (Optional[str]): Only return jobs created at or after this ISO timestamp.
+            created_before (Optional[str]): Only return jobs created before this ISO timestamp.
+            after (Optional[Tuple[str, str]]): ``(created_at, job_id)`` of the last job of
+                the previous page; only jobs ordered after it are returned.
+            limit (int): Maximum number of jobs to return.
+
+        Returns:
+            List[Dict[str, Any]]: Copies of the matching jobs.
+        """
+
+    @abstractmethod
+    def count_by_status(self) -> Dict[str, int]:
+        """Return the number of jobs with each status."""
+
+    @abstractmethod
+    def find_by_fingerprint(self, fingerprint: str, statuses: Iterable[str], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return the newest jobs with a request fingerprint and one of ``statuses``.
+
+        Returns:
+            List[Dict[str, Any]]: Copies of the matching jobs, newest first.
+        """
+
+    @abstractmethod
+    def compact(self, ttl_seconds: float) -> List[str]:
+        """
+        Remove finished jobs that completed more than ``ttl_seconds`` ago.
+
+        Returns:
+            List[str]: IDs of the removed jobs.
+        """
+
+
+def _expired_before(ttl_seconds: float) -> str:
+    return (datetime.utcnow() - timedelta(seconds=ttl_seconds)).isoformat()
+
+
+class MemoryJobStore(JobStore):
+    """Job store kept in a dict; lost on restart and private to one process."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs.setdefault(job_id, {"job_id": job_id}).update(fields)
+
+    def transition(self, job_id: str, from_statuses: Iterable[str], fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.get("status") not in tuple(from_statuses):
+                return False
+            job.update(fields)
+            return True
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def query(self, statuses: Optional[Iterable[str]] = None, created_after: Optional[str] = None,
+              created_before: Optional[str] = None, after: Optional[Tuple[str, str]] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        statuses = tuple(statuses) if statuses is not None else None
+        with self._lock:
+            matches = [
+                dict(job) for job in self._jobs.values()
+                if (statuses is None or job.get("status") in statuses)
+                and (created_after is None or job["created_at"] >= created_after)
+                and (created_before is None or job["created_at"] < created_before)
+                and (after is None or (job["created_at"], job["job_id"]) > tuple(after))
+            ]
+        matches.sort(key=lambda job: (job["created_at"], job["job_id"]))
+        return matches[:limit]
+
+    def find_by_fingerprint(self, fingerprint: str, statuses: Iterable[str], limit: int = 10) -> List[Dict[str, Any]]:
+        statuses = tuple(statuses)
+        with self._lock:
+            matches = [
+                dict(job) for job in self._jobs.values()
+                if job.get("fingerprint") == fingerprint and job.get("status") in statuses
+            ]
+        matches.sort(key=lambda job: (job["created_at"], job["job_id"]), reverse=True)
+        return matches[:limit]
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for job in self._jobs.values():
+                status = getattr(job.get("status"), "value", job.get("status"))
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def compact(self, ttl_seconds: float) -> List[str]:
+        cutoff = _expired_before(ttl_seconds)
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.get("status") in TERMINAL_STATUSES and job.get("completed_at", cutoff) < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return expired
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store in an SQLite database in WAL mode.
+
+    Several processes can share the database, e.g. multiple API workers serving status
+    reads. Updates are read-modify-write transactions under ``BEGIN IMMEDIATE``, so
+    concurrent writers never lose each other's fields.
+    """
+
+    _TABLE = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            completed_at TEXT,
+            dataset_hash TEXT,
+            fingerprint TEXT,
+            data TEXT NOT NULL
+        )
+        """
+    # Columns added to the table after its first version, created on older databases
+    _ADDED_COLUMNS = {"fingerprint": "TEXT"}
+    _INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at, job_id)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at, job_id)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_dataset_hash ON jobs (dataset_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_completed_at ON jobs (completed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_fingerprint ON jobs (fingerprint, status, created_at)",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(self._TABLE)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in self._ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            for statement in self._INDEXES:
+                conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _row(job: Dict[str, Any]) -> tuple:
+        status = job.get("status", TrainingStatus.PENDING)
+        return (
+            getattr(status, "value", status),
+            job.get("created_at") or datetime.utcnow().isoformat(),
+            job.get("completed_at"),
+            job.get("dataset_hash"),
+            job.get("fingerprint"),
+            json.dumps(job),
+            job["job_id"],
+        )
+
+    def _write(self, conn: sqlite3.Connection, job: Dict[str, Any], exists: bool) -> None:
+        if exists:
+            conn.execute(
+                "UPDATE jobs SET status = ?, created_at = ?, completed_at = ?, dataset_hash = ?, fingerprint = ?, "
+                "data = ? WHERE job_id = ?",
+                self._row(job)
+            )
+        else:
+            conn.execute(
+                "INSERT INTO jobs (status, created_at, completed_at, dataset_hash, fingerprint, data, job_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._row(job)
+            )
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            self._write(conn, job, exists=False)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            job = json.loads(row[0]) if row is not None else {"job_id": job_id}
+            job.update(fields)
+            self._write(conn, job, exists=row is not None)
+
+    def transition(self, job_id: str, from_statuses: Iterable[str], fields: Dict[str, Any]) -> bool:
+        from_statuses = [getattr(status, "value", status) for status in from_statuses]
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status, data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or row[0] not in from_statuses:
+                return False
+            job = json.loads(row[1])
+            job.update(fields)
+            self._write(conn, job, exists=True)
+            return True
+
+    def delete(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def query(self, statuses: Optional[Iterable[str]] = None, created_after: Optional[str] = None,
+              created_before: Optional[str] = None, after: Optional[Tuple[str, str]] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        # Pages are read by seeking the (status, created_at, job_id) or
+        # (created_at, job_id) index, never by scanning and skipping rows
+        clauses: List[str] = []
+        args: List[Any] = []
+        if statuses is not None:
+            statuses = [getattr(status, "value", status) for status in statuses]
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+            args.extend(statuses)
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            args.append(created_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            args.append(created_before)
+        if after is not None:
+            clauses.append("(created_at, job_id) > (?, ?)")
+            args.extend(after)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT data FROM jobs {where}ORDER BY created_at, job_id LIMIT ?",
+            (*args, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def find_by_fingerprint(self, fingerprint: str, statuses: Iterable[str], limit: int = 10) -> List[Dict[str, Any]]:
+        statuses = [getattr(status, "value", status) for status in statuses]
+        rows = self._connection().execute(
+            f"SELECT data FROM jobs WHERE fingerprint = ? AND status IN ({','.join('?' * len(statuses))}) "
+            "ORDER BY created_at DESC, job_id DESC LIMIT ?",
+            (fingerprint, *statuses, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_by_status(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def compact(self, ttl_seconds: float) -> List[str]:
+        terminal = [status.value for status in TERMINAL_STATUSES]
+        condition = f"completed_at < ? AND status IN ({','.join('?' * len(terminal))})"
+        params = (_expired_before(ttl_seconds), *terminal)
+        with self._transaction() as conn:
+            expired = [row[0] for row in conn.execute(f"SELECT job_id FROM jobs WHERE {condition}", params)]
+            conn.execute(f"DELETE FROM jobs WHERE {condition}", params)
+            return expired
+
+
+def create_job_store(backend: str, path: str) -> JobStore:
+    """Create the job store configured by ``JOB_STORE_BACKEND``."""
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore(path)
+    raise ValueError(f"Unknown job store backend: {backend}")
@@ -0,0 +1,211 @@
+"""
+Module for loading cached datasets into DataFrames.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache import _file_lock, dataset_cache
+from .config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# Version of the columnar copies; older copies are parsed again. Version 2 only
+# downcasts floats that survive the conversion exactly.
+COLUMNAR_FORMAT = 2
+
+_INT32 = np.iinfo(np.int32)
+
+
+def _columnar_path(dataset_path: Path) -> Path:
+    """Directory holding the parsed, column-per-file copy of a dataset."""
+    return dataset_path.with_suffix(".columns")
+
+
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink numeric columns in place: integers to int32 when their range fits, and
+    floats to float32 when ``DATASET_DOWNCAST_FLOATS`` is set and every value,
+    including missing ones, survives the round trip exactly. Downcasting therefore
+    never changes a value, e.g. 16777217.0 or a large ID keeps its column float64.
+    """
+    for name in df.columns:
+        values = df[name].to_numpy()
+        kind = values.dtype.kind
+        if kind in "iu" and values.dtype.itemsize > 4 and len(values):
+            if _INT32.min <= values.min() and values.max() <= _INT32.max:
+                df[name] = values.astype(np.int32)
+        elif kind == "f" and values.dtype.itemsize > 4 and settings.DATASET_DOWNCAST_FLOATS:
+            with np.errstate(over="ignore"):
+                narrowed = values.astype(np.float32)
+            if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+                df[name] = narrowed
+    return df
+
+
+def read_columns(dataset_path: Path) -> List[str]:
+    """Column names of a CSV dataset, read from its header."""
+    return [str(name) for name in pd.read_csv(dataset_path, nrows=0).columns]
+
+
+def load_dataset(dataset_path: Path, columns: Optional[List[str]] = None,
+                 parsed: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Load a dataset, reusing its parsed columnar copy when one exists.
+
+    Only the requested columns are parsed. Each parsed column is stored as a ``.npy``
+    file next to the CSV, with numbers downcast to 32 bits where that is lossless.
+    Strings are stored as categoricals, which only serves string targets, as features
+    must be numeric. Later loads memory-map the stored columns and only parse
+    the requested columns that are not stored yet, so worker processes share the data
+    through the page cache instead of each parsing the CSV.
+
+    Args:
+        dataset_path (Path): Path of the cached CSV file.
+        columns (Optional[List[str]]): Columns to load. Columns missing from the
+            dataset are skipped. Defaults to all columns.
+        parsed (Optional[pd.DataFrame]): Columns of the dataset already parsed while
+            it was downloaded; used instead of parsing the CSV again.
+
+    Returns:
+        pd.DataFrame: The loaded dataset.
+    """
+    dataset_path = Path(dataset_path)
+    columnar_path = _columnar_path(dataset_path)
+    if (columnar_path / MANIFEST_NAME).exists():
+        try:
+            _complete_columnar(dataset_path, columnar_path, columns)
+            df = _read_columnar(columnar_path, columns)
+            logger.info(f"Loaded {len(df.columns)} columns from columnar cache {columnar_path}")
+            return df
+        except Exception as e:
+            logger.warning(f"Failed to read columnar cache {columnar_path}, re-parsing: {str(e)}")
+            shutil.rmtree(columnar_path, ignore_errors=True)
+
+    if parsed is not None:
+        df = parsed
+    else:
+        logger.info(f"Parsing CSV {dataset_path}")
+        df = _parse(dataset_path, columns)
+    df = downcast(df)
+    try:
+        _write_columnar(df, columnar_path, read_columns(dataset_path))
+        # Serve the first load from the columnar copy too, so every job sees the same dtypes
+        _complete_columnar(dataset_path, columnar_path, columns)
+        return _read_columnar(columnar_path, columns)
+    except Exception as e:
+        logger.warning(f"Failed to write columnar cache {columnar_path}: {str(e)}")
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df
+
+
+def _parse(dataset_path: Path, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Parse the requested columns of a CSV; columns missing from it are skipped."""
+    if columns is None:
+        return pd.read_csv(dataset_path)
+    wanted = set(columns)
+    return pd.read_csv(dataset_path, usecols=lambda name: name in wanted)
+
+
+def _complete_columnar(dataset_path: Path, columnar_path: Path, columns: Optional[List[str]]) -> None:
+    """Parse and store the requested columns that the columnar copy does not hold yet."""
+    manifest = json.loads((columnar_path / MANIFEST_NAME).read_text())
+    if manifest.get("format") != COLUMNAR_FORMAT:
+        raise ValueError(f"Columnar format {manifest.get('format')} is outdated")
+    all_columns = manifest.get("all_columns") or [entry["name"] for entry in manifest["columns"]]
+    stored = {entry["name"] for entry in manifest["columns"]}
+    wanted = all_columns if columns is None else [col for col in columns if col in all_columns]
+    if all(col in stored for col in wanted):
+        return
+
+    with _file_lock(columnar_path.with_suffix(".columns.lock")):
+        manifest = json.loads((columnar_path / MANIFEST_NAME).read_text())
+        stored = {entry["name"] for entry in manifest["columns"]}
+        missing = [col for col in wanted if col not in stored]
+        if not missing:
+            return
+        logger.info(f"Parsing {len(missing)} more columns of {dataset_path}")
+        df = downcast(_parse(dataset_path, missing))
+        entries, size = _save_columns(df, columnar_path, start=len(manifest["columns"]))
+        manifest["columns"].extend(entries)
+        temp_manifest = columnar_path / f"{MANIFEST_NAME}.tmp"
+        temp_manifest.write_text(json.dumps(manifest))
+        os.replace(temp_manifest, columnar_path / MANIFEST_NAME)
+    dataset_cache.add_derived_size(columnar_path.with_suffix(".blob"), size)
+
+
+def _save_columns(df: pd.DataFrame, directory: Path, start: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Store each column of ``df`` as ``.npy`` files in ``directory``, numbered from ``start``.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The manifest entries and the bytes written.
+    """
+    entries: List[Dict[str, Any]] = []
+    size = 0
+    for i, name in enumerate(df.columns, start=start):
+        series = df[name]
+        entry: Dict[str, Any] = {"name": str(name), "file": f"{i}.npy"}
+        values = series.to_numpy()
+        if values.dtype.kind in "biufcmM":
+            entry["kind"] = "array"
+        else:
+            categorical = pd.Categorical(series.astype(object).where(series.notna(), None))
+            values = categorical.codes
+            categories = np.asarray(categorical.categories.astype(str), dtype=str)
+            entry["kind"] = "categorical"
+            entry["categories"] = f"{i}.categories.npy"
+            np.save(directory / entry["categories"], categories)
+            size += (directory / entry["categories"]).stat().st_size
+        np.save(directory / entry["file"], np.ascontiguousarray(values))
+        size += (directory / entry["file"]).stat().st_size
+        entries.append(entry)
+    return entries, size
+
+
+def _write_columnar(df: pd.DataFrame, columnar_path: Path, all_columns: List[str]) -> None:
+    """Store the columns of ``df`` as ``.npy`` files, publishing the directory atomically."""
+    temp_path = Path(tempfile.mkdtemp(dir=columnar_path.parent, prefix=f"{os.getpid()}-", suffix=".columns.tmp"))
+    try:
+        entries, size = _save_columns(df, temp_path)
+        manifest = {"format": COLUMNAR_FORMAT, "rows": len(df), "columns": entries, "all_columns": all_columns}
+        (temp_path / MANIFEST_NAME).write_text(json.dumps(manifest))
+        try:
+            os.rename(temp_path, columnar_path)
+        except OSError:
+            # Another worker published the same dataset first
+            return
+        dataset_cache.add_derived_size(columnar_path.with_suffix(".blob"), size)
+        logger.info(f"Wrote columnar cache {columnar_path} ({size} bytes)")
+    finally:
+        if temp_path.exists():
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _read_columnar(columnar_path: Path, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Memory-map the requested columns of a columnar dataset."""
+    manifest = json.loads((columnar_path / MANIFEST_NAME).read_text())
+    entries = manifest["columns"]
+    if columns is not None:
+        wanted = set(columns)
+        entries = [entry for entry in entries if entry["name"] in wanted]
+
+    data = {}
+    for entry in entries:
+        values = np.load(columnar_path / entry["file"], mmap_mode='r')
+        if entry["kind"] == "categorical":
+            categories = np.load(columnar_path / entry["categories"])
+            values = pd.Categorical.from_codes(values, categories=categories)
+        data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,89 @@
+"""
+Module for reusing the results of identical training requests.
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import __version__
+from .algorithms import coerce_params
+from .artifacts import library_versions
+from .cache import dataset_cache
+from .config import settings
+from .getDataset import resolve_blob_id
+from .models import TrainingRequest, TrainingStatus
+from .training import job_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(request: TrainingRequest) -> Optional[str]:
+    """
+    Fingerprint everything that determines the result of a training request.
+
+    The fingerprint covers the decrypted blob ID (so different encryptions of the same
+    blob match), the algorithm with its parameters converted to their declared types,
+    the columns, the validation and incremental options, the settings that change the
+    fitted model, and the versions of the service and of the libraries that fit and
+    pickle it. Scheduling options such as ``priority`` are left out.
+
+    Returns:
+        Optional[str]: The hex SHA-256 fingerprint, or None if the dataset hash cannot
+        be decrypted.
+    """
+    try:
+        blob_id = resolve_blob_id(request.dataset_hash, "my-super-secret")
+    except Exception:
+        return None
+    description = {
+        "blob_id": blob_id,
+        "algorithm": request.algorithm,
+        "params": coerce_params(request.algorithm, request.params),
+        "features": request.features,
+        "target": request.target,
+        "test_size": request.test_size,
+        "cv_folds": request.cv_folds,
+        "shuffle": request.shuffle,
+        "random_state": request.random_state,
+        "incremental": request.incremental,
+        "epochs": request.epochs if request.incremental else None,
+        "chunk_rows": (request.chunk_rows or settings.INCREMENTAL_CHUNK_ROWS) if request.incremental else None,
+        "downcast_floats": settings.DATASET_DOWNCAST_FLOATS,
+        "versions": {"mltrainingserver": __version__, **library_versions()}
+    }
+    canonical = json.dumps(description, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def find_reusable_job(request: TrainingRequest, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a job whose result an identical request can share.
+
+    A pending or running job with the same fingerprint is returned first, so that
+    in-flight duplicates follow it. Otherwise the newest completed job with the same
+    fingerprint is returned if it trained on the dataset content now in the cache and
+    its model artifact still exists.
+
+    Returns:
+        Optional[Dict[str, Any]]: The job, or None if the request has to be trained.
+    """
+    active = job_store.find_by_fingerprint(fingerprint, (TrainingStatus.PENDING, TrainingStatus.RUNNING), limit=1)
+    if active:
+        return active[0]
+
+    completed = job_store.find_by_fingerprint(fingerprint, (TrainingStatus.COMPLETE,))
+    if not completed:
+        return None
+    # The content hash is only known while the dataset is cached; without it the
+    # dataset may have changed, so the request is trained again
+    checksum = dataset_cache.checksum(resolve_blob_id(request.dataset_hash, "my-super-secret"))
+    if checksum is None:
+        return None
+    for job in completed:
+        if job.get("dataset_sha256") == checksum and job.get("model_path") and Path(job["model_path"]).exists():
+            return job
+    return None
@@ -10,6 +10,7 @@ class TrainingStatus(str, Enum):
     RUNNING = "running"
     COMPLETE = "complete"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class DatasetInfo(BaseModel):
     hash: str = Field(..., description="Hash of the dataset")
@@ -26,6 +27,24 @@ class TrainingRequest(BaseModel):
     )
     features: Optional[List[str]] = Field(None, description="List of features to use for training")
     target: Optional[str] = Field(None, description="Target column name")
+    priority: int = Field(0, description="Scheduling priority; higher values run first")
+    test_size: Optional[float] = Field(
+        None, gt=0, lt=1,
+        description="Fraction of rows held out to score the model; the model is fitted on the rest"
+    )
+    cv_folds: Optional[int] = Field(None, ge=2, description="Number of k-fold cross-validation folds")
+    shuffle: bool = Field(True, description="Shuffle rows before the hold-out split and the folds")
+    random_state: Optional[int] = Field(None, description="Seed for the hold-out split and the folds")
+    incremental: bool = Field(
+        False,
+        description="Train out of core with an SGD-based estimator, reading the dataset in chunks"
+    )
+    epochs: int = Field(1, ge=1, description="Passes over the dataset in incremental mode")
+    chunk_rows: Optional[int] = Field(None, ge=1, description="Rows held in memory at once in incremental mode")
+    reuse: bool = Field(
+        True,
+        description="Return an identical in-flight or completed job instead of training again"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -33,11 +52,13 @@ class TrainingRequest(BaseModel):
                 "dataset_hash": "abc123",
                 "algorithm": "linear_regression",
                 "params": {
-                    "fit_intercept": True,
-                    "normalize": False
+                    "fit_intercept": True
                 },
                 "features": ["feature1", "feature2"],
-                "target": "target_column"
+                "target": "target_column",
+                "priority": 0,
+                "test_size": 0.2,
+                "cv_folds": 5
             }
         }
     }
@@ -46,22 +67,89 @@ class TrainingResponse(BaseModel):
     job_id: str = Field(..., description="Unique identifier for the training job")
     status: TrainingStatus = Field(..., description="Current status of the training job")
     created_at: str = Field(..., description="Timestamp when the job was created")
+    queue_position: Optional[int] = Field(None, description="Position in the training queue while pending")
+    reused: bool = Field(False, description="The job was started by an earlier identical request")
 
     model_config = {
         "json_schema_extra": {
             "example": {
                 "job_id": "job_123",
                 "status": "pending",
-                "created_at": "2024-05-09T12:00:00Z"
+                "created_at": "2024-05-09T12:00:00Z",
+                "queue_position": 3,
+                "reused": False
+            }
+        }
+    }
+
+class BatchTrainingRequest(BaseModel):
+    requests: List[TrainingRequest] = Field(..., min_length=1, description="Training jobs to submit")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "requests": [
+                    {"dataset_hash": "abc123", "algorithm": "linear_regression", "target": "target_column"},
+                    {"dataset_hash": "abc123", "algorithm": "ridge", "target": "target_column"}
+                ]
             }
         }
     }
 
+class BatchTrainingResponse(BaseModel):
+    jobs: List[TrainingResponse] = Field(..., description="Created jobs, in the order of the requests")
+
+class JobPage(BaseModel):
+    jobs: List[Dict[str, Any]] = Field(..., description="Jobs ordered by creation time, including their metrics")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, or null on the last page")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "jobs": [
+                    {
+                        "job_id": "job_123",
+                        "status": "complete",
+                        "created_at": "2024-05-09T12:00:00Z",
+                        "metrics": {"accuracy": 0.95, "loss": 0.05, "training_time": 1.5, "model_size": 1024}
+                    }
+                ],
+                "next_cursor": "MjAyNC0wNS0wOVQxMjowMDowMFoham9iXzEyMw"
+            }
+        }
+    }
+
+class FoldResult(BaseModel):
+    fold: int = Field(..., description="Index of the fold, starting at 0")
+    accuracy: float = Field(..., description="Accuracy on the fold's test rows (R² for regression)")
+    loss: float = Field(..., description="Loss on the fold's test rows")
+    fit_time: float = Field(..., description="Time taken to fit the fold in seconds")
+    score_time: float = Field(..., description="Time taken to score the fold in seconds")
+    n_train: int = Field(..., description="Number of training rows")
+    n_test: int = Field(..., description="Number of test rows")
+
 class TrainingMetrics(BaseModel):
     accuracy: Optional[float] = Field(None, description="Model accuracy score")
     loss: Optional[float] = Field(None, description="Training loss value")
     training_time: float = Field(..., description="Time taken for training in seconds")
     model_size: int = Field(..., description="Size of the trained model in bytes")
+    validation: str = Field(
+        "train",
+        description="Rows accuracy and loss were measured on: train, holdout, cv (mean over folds) "
+                    "or progressive (each chunk scored before training on it)"
+    )
+    cv_accuracy: Optional[float] = Field(None, description="Mean accuracy over the cross-validation folds")
+    cv_accuracy_std: Optional[float] = Field(None, description="Standard deviation of the fold accuracies")
+    cv_loss: Optional[float] = Field(None, description="Mean loss over the cross-validation folds")
+    folds: Optional[List[FoldResult]] = Field(None, description="Per-fold cross-validation results")
+    phase_timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Seconds spent in each phase: decrypt, download, parse, cross_validate, fit, "
+                    "evaluate and serialize (scan instead of parse for incremental jobs)"
+    )
+    cpu_time: Optional[float] = Field(None, description="CPU seconds used by the job")
+    peak_rss_bytes: Optional[int] = Field(None, description="Peak resident memory of the job process in bytes")
+    bytes_downloaded: Optional[int] = Field(None, description="Dataset bytes downloaded; 0 on a cache hit")
 
     model_config = {
         "json_schema_extra": {
@@ -69,11 +157,109 @@ class TrainingMetrics(BaseModel):
                 "accuracy": 0.95,
                 "loss": 0.05,
                 "training_time": 1.5,
-                "model_size": 1024
+                "model_size": 1024,
+                "validation": "holdout",
+                "cv_accuracy": 0.94,
+                "cv_accuracy_std": 0.01,
+                "cv_loss": 0.06,
+                "folds": [
+                    {"fold": 0, "accuracy": 0.95, "loss": 0.05, "fit_time": 0.3,
+                     "score_time": 0.01, "n_train": 800, "n_test": 200}
+                ],
+                "phase_timings": {"decrypt": 0.0001, "download": 0.41, "parse": 0.08,
+                                  "cross_validate": 0.9, "fit": 1.2, "evaluate": 0.05, "serialize": 0.01},
+                "cpu_time": 3.4,
+                "peak_rss_bytes": 268435456,
+                "bytes_downloaded": 1048576
+            }
+        }
+    }
+
+class PredictRequest(BaseModel):
+    rows: List[Union[Dict[str, Any], List[Any]]] = Field(
+        ...,
+        min_length=1,
+        description="Rows to predict, as objects keyed by feature or arrays in training feature order"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "rows": [
+                    {"feature1": 1.5, "feature2": 0.3},
+                    {"feature1": 2.0, "feature2": -0.7}
+                ]
+            }
+        }
+    }
+
+class PredictResponse(BaseModel):
+    job_id: str = Field(..., description="Job whose model made the predictions")
+    predictions: List[Any] = Field(..., description="One prediction per row, in request order")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "job_id": "job_123",
+                "predictions": [3.2, 4.1]
             }
         }
     }
 
+class SearchStrategy(str, Enum):
+    GRID = "grid"
+    RANDOM = "random"
+
+class ParameterRange(BaseModel):
+    min: float = Field(..., description="Lower bound of the range")
+    max: float = Field(..., description="Upper bound of the range")
+    log: bool = Field(False, description="Sample uniformly on a log scale")
+
+class SweepRequest(BaseModel):
+    dataset_hash: str = Field(..., description="Hash of the dataset to use for training")
+    algorithm: str = Field(..., description="Name of the algorithm to use")
+    search: SearchStrategy = Field(SearchStrategy.GRID, description="Grid or random search")
+    space: Dict[str, Union[List[Union[str, int, float, bool, None]], ParameterRange]] = Field(
+        ...,
+        description="Candidate values per parameter; ranges are only allowed for random search"
+    )
+    n_iter: int = Field(10, ge=1, description="Number of candidates sampled by random search")
+    random_state: Optional[int] = Field(None, description="Seed for sampling and the validation split")
+    validation_fraction: float = Field(0.2, gt=0, lt=1, description="Fraction of rows held out for scoring")
+    successive_halving: bool = Field(False, description="Drop weak candidates early on growing subsets of the data")
+    halving_factor: int = Field(3, ge=2, description="Fraction of candidates kept (1/factor) per halving round")
+    features: Optional[List[str]] = Field(None, description="List of features to use for training")
+    target: Optional[str] = Field(None, description="Target column name")
+    priority: int = Field(0, description="Scheduling priority; higher values run first")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "dataset_hash": "abc123",
+                "algorithm": "random_forest",
+                "search": "random",
+                "space": {
+                    "n_estimators": [50, 100, 200],
+                    "max_depth": {"min": 2, "max": 16}
+                },
+                "n_iter": 20,
+                "successive_halving": True,
+                "target": "target_column"
+            }
+        }
+    }
+
+class LeaderboardEntry(BaseModel):
+    rank: int = Field(..., description="Position in the leaderboard, starting at 1")
+    sub_job_id: str = Field(..., description="Identifier of the candidate within the sweep")
+    params: Dict[str, Any] = Field(..., description="Parameters of the candidate")
+    accuracy: Optional[float] = Field(None, description="Validation accuracy (R² for regression)")
+    loss: Optional[float] = Field(None, description="Validation loss")
+    fit_time: float = Field(..., description="Time taken to fit the candidate in seconds")
+    n_samples: int = Field(..., description="Training rows used in the candidate's last round")
+    rounds: int = Field(..., description="Number of halving rounds the candidate took part in")
+    error: Optional[str] = Field(None, description="Error message if the fit failed")
+
 class AlgorithmParameter(BaseModel):
     type: str
     default: Any
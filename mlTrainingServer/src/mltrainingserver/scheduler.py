@@ -0,0 +1,591 @@
+"""
+Scheduler module for running training jobs on a bounded worker pool or, in
+distributed mode, through the durable job queue.
+"""
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .artifacts import delete_model, remove_partial_models
+from .cache import dataset_cache
+from .config import settings
+from .events import job_events
+from .jobqueue import QueueFullError, SQLiteJobQueue, target_name
+from .models import TrainingStatus
+from .telemetry import job_telemetry
+from . import training
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuses of jobs that have not finished yet
+ACTIVE_STATUSES = (TrainingStatus.PENDING, TrainingStatus.RUNNING)
+# How long a job may outlive its timeout before its worker counts as stuck
+STUCK_GRACE_SECONDS = 60
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    raise SystemExit(f"Terminated by signal {signum}")
+
+
+def _child_main(conn, job_id: str, target: Callable, kwargs: Dict[str, Any]) -> None:
+    """
+    Entry point of a worker process: run the job and stream job updates to the parent.
+
+    The process leads its own process group, so that killing the job also kills the
+    processes it started for parallel fits. SIGTERM exits through the normal unwinding,
+    letting the job remove its temporary files as soon as the running fit returns.
+    """
+    os.setpgrp()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+    def send(fields: Dict[str, Any]) -> None:
+        try:
+            conn.send(fields)
+        except BrokenPipeError:
+            # The parent stopped listening: it is killing the job, or it died
+            raise SystemExit("Job process lost its parent")
+
+    training.set_update_hook(lambda jid, fields: send(fields))
+    try:
+        target(**kwargs)
+    except Exception as e:
+        logger.error(f"Worker process failed for job {job_id}: {str(e)}")
+        logger.error(traceback.format_exc())
+        send({
+            "status": TrainingStatus.FAILED,
+            "error": str(e),
+            "completed_at": datetime.utcnow().isoformat()
+        })
+    finally:
+        conn.close()
+
+
+def job_context(start_method: Optional[str] = None):
+    """Multiprocessing context for job processes, preloading the training code in a forkserver."""
+    ctx = multiprocessing.get_context(start_method)
+    if ctx.get_start_method() == "forkserver":
+        ctx.set_forkserver_preload(["mltrainingserver.training"])
+    return ctx
+
+
+def _signal_group(process, signum: int) -> None:
+    try:
+        os.killpg(process.pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _terminate(process) -> None:
+    """Stop a job process and its children, killing them if they ignore SIGTERM for 5 seconds."""
+    _signal_group(process, signal.SIGTERM)
+    process.join(5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    # Children that outlived the job process, such as parallel fit workers
+    _signal_group(process, signal.SIGKILL)
+
+
+def _remove_partial_files(job_id: str, pid: int) -> None:
+    """Remove the temporary dataset and model files a killed job process left behind."""
+    try:
+        removed = dataset_cache.remove_partial(pid) + remove_partial_models(pid)
+        if removed:
+            logger.info(f"Removed {removed} partial files of job {job_id}")
+    except Exception as e:
+        logger.warning(f"Failed to remove partial files of job {job_id}: {str(e)}")
+
+
+def run_job_process(ctx, job_id: str, target: Callable, kwargs: Dict[str, Any], timeout: float,
+                    on_start: Optional[Callable[[Any], None]] = None,
+                    should_stop: Optional[Callable[[], bool]] = None) -> bool:
+    """
+    Run a job in a child process, relaying its updates until it exits or times out.
+
+    Updates are only applied while the job is pending or running, so a job cancelled
+    meanwhile stays cancelled. A job that times out, or whose process exits without
+    finishing it, is failed and its model artifact removed. The temporary files of a
+    killed process are removed.
+
+    Args:
+        ctx: Multiprocessing context from ``job_context``.
+        job_id (str): The job ID.
+        target (Callable): The job function.
+        kwargs (Dict[str, Any]): Arguments of the job function.
+        timeout (float): Seconds after which the process is killed.
+        on_start (Optional[Callable[[Any], None]]): Called with the started process.
+        should_stop (Optional[Callable[[], bool]]): Checked every second; when it
+            returns True the process is killed and the job left as it is.
+
+    Returns:
+        bool: False if the job was stopped through ``should_stop``.
+    """
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(
+        target=_child_main,
+        args=(child_conn, job_id, target, kwargs),
+        name=f"training-{job_id}"
+    )
+    process.start()
+    child_conn.close()
+    if on_start is not None:
+        on_start(process)
+    logger.info(f"Started worker process {process.pid} for job {job_id}")
+
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    stopped = False
+    try:
+        while True:
+            if should_stop is not None and should_stop():
+                stopped = True
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            if parent_conn.poll(min(remaining, 1.0)):
+                try:
+                    fields = parent_conn.recv()
+                except EOFError:
+                    break
+                training.transition_job(job_id, ACTIVE_STATUSES, **fields)
+            elif not process.is_alive():
+                break
+    finally:
+        parent_conn.close()
+
+    if stopped or timed_out:
+        if stopped:
+            logger.warning(f"Stopping job {job_id} in worker process {process.pid}")
+        else:
+            logger.warning(f"Job {job_id} exceeded TRAINING_TIMEOUT of {timeout}s, terminating")
+        _terminate(process)
+        _remove_partial_files(job_id, process.pid)
+        if stopped:
+            return False
+        error = f"Training timed out after {timeout} seconds"
+    else:
+        process.join()
+        if process.exitcode != 0:
+            _remove_partial_files(job_id, process.pid)
+        error = f"Worker process exited with code {process.exitcode}"
+
+    if training.transition_job(
+        job_id,
+        ACTIVE_STATUSES,
+        status=TrainingStatus.FAILED,
+        error=error,
+        completed_at=datetime.utcnow().isoformat()
+    ):
+        delete_model(job_id)
+    return True
+
+
+def requeue_preempted(job_id: str) -> None:
+    """Put a preempted job back to pending, counting its preemptions."""
+    job = training.job_store.get(job_id) or {}
+    training.transition_job(
+        job_id,
+        (TrainingStatus.RUNNING,),
+        status=TrainingStatus.PENDING,
+        phase=None,
+        preemptions=(job.get("preemptions") or 0) + 1
+    )
+
+
+def record_job(job_id: str) -> None:
+    """Add a finished job's timings and resource usage to the service metrics."""
+    try:
+        job = training.job_store.get(job_id)
+        if job is not None:
+            job_telemetry.record_job(job)
+    except Exception as e:
+        logger.warning(f"Failed to record metrics of job {job_id}: {str(e)}")
+
+
+def reclaim_expired_leases(queue: SQLiteJobQueue) -> None:
+    """Queue the jobs whose worker stopped heartbeating again, failing those out of attempts."""
+    requeued, abandoned = queue.reclaim_expired()
+    for job_id in requeued:
+        training.transition_job(job_id, (TrainingStatus.RUNNING,), status=TrainingStatus.PENDING)
+    for job_id in abandoned:
+        training.transition_job(
+            job_id,
+            ACTIVE_STATUSES,
+            status=TrainingStatus.FAILED,
+            error=f"Worker stopped responding {queue.max_attempts} times",
+            completed_at=datetime.utcnow().isoformat()
+        )
+
+
+class JobScheduler:
+    """
+    Bounded pool of training workers fed from a priority queue.
+
+    At most ``max_workers`` jobs run at once, each in its own child process so that
+    it can be killed when it exceeds ``timeout`` seconds or is cancelled. At most
+    ``max_jobs`` jobs may be queued or running; further submissions raise
+    ``QueueFullError``. With ``preemption``, a queued job that finds no free worker
+    stops the lowest-priority running job of lower priority, which goes back to the
+    queue ahead of later jobs of its priority and starts over when a worker frees up.
+    """
+
+    def __init__(self, max_workers: int, max_jobs: int, timeout: float, start_method: Optional[str] = None,
+                 preemption: bool = False):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.preemption = preemption
+        self._ctx = job_context(start_method)
+        self._heap: List[Tuple[int, int, str]] = []
+        self._pending: Dict[str, Tuple[Tuple[int, int, str], Callable, Dict[str, Any]]] = {}
+        self._running: Dict[str, Any] = {}
+        self._assigned: Dict[str, Tuple[Tuple[int, int, str], Callable, Dict[str, Any]]] = {}
+        # Running jobs to stop, with the reason: "cancel" or "preempt"
+        self._stop_requests: Dict[str, str] = {}
+        self._started: Dict[str, float] = {}
+        self._busy_seconds = 0.0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+
+    def submit(self, job_id: str, target: Callable, kwargs: Dict[str, Any], priority: int = 0) -> int:
+        """Queue a job and return its 1-based position in the queue."""
+        return self.submit_many([(job_id, target, kwargs, priority)])[0]
+
+    def submit_many(self, jobs: List[Tuple[str, Callable, Dict[str, Any], int]]) -> List[int]:
+        """
+        Queue several ``(job_id, target, kwargs, priority)`` jobs at once.
+
+        Either all jobs are queued or, when they do not all fit, none is.
+
+        Returns:
+            List[int]: The 1-based queue position of each job.
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+            if len(self._pending) + len(self._running) + len(jobs) > self.max_jobs:
+                raise QueueFullError(
+                    f"Training queue is full ({self.max_jobs} jobs queued or running)"
+                )
+            self._start_workers()
+            entries = []
+            for job_id, target, kwargs, priority in jobs:
+                entry = (-priority, next(self._seq), job_id)
+                heapq.heappush(self._heap, entry)
+                self._pending[job_id] = (entry, target, kwargs)
+                entries.append(entry)
+            self._cond.notify(len(jobs))
+            if self.preemption:
+                self._preempt()
+            order = {entry: position for position, entry in enumerate(sorted(self._heap), start=1)}
+            return [order[entry] for entry in entries]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove a job from the queue, or kill it if it is running.
+
+        Returns:
+            bool: Whether the job was queued or running.
+        """
+        with self._cond:
+            pending = self._pending.pop(job_id, None)
+            if pending is not None:
+                self._heap.remove(pending[0])
+                heapq.heapify(self._heap)
+                return True
+            if job_id in self._running:
+                self._stop_requests[job_id] = "cancel"
+                return True
+            return False
+
+    def free_slots(self) -> int:
+        """Number of jobs that can still be queued."""
+        with self._cond:
+            return max(0, self.max_jobs - len(self._pending) - len(self._running))
+
+    def is_full(self) -> bool:
+        """Whether the number of queued and running jobs has reached the limit."""
+        return self.free_slots() == 0
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Return the 1-based queue position of a pending job, or None if it is not queued."""
+        with self._cond:
+            pending = self._pending.get(job_id)
+            if pending is None:
+                return None
+            return self._position(pending[0])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the current queue depth and worker usage.
+
+        ``busy_seconds`` is the total time workers have spent running jobs, including
+        the jobs still running. ``stuck`` counts running jobs that are well past their
+        timeout, which means the worker failed to kill them.
+        """
+        now = time.monotonic()
+        with self._cond:
+            running_seconds = [now - started for started in self._started.values()]
+            return {
+                "queued": len(self._pending),
+                "running": len(self._running),
+                "workers": self.max_workers,
+                "workers_alive": sum(worker.is_alive() for worker in self._workers),
+                "workers_started": len(self._workers),
+                "max_jobs": self.max_jobs,
+                "busy_seconds": self._busy_seconds + sum(running_seconds),
+                "stuck": sum(seconds > self.timeout + STUCK_GRACE_SECONDS for seconds in running_seconds)
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs and terminate running worker processes."""
+        with self._cond:
+            self._shutdown = True
+            processes = [p for p in self._running.values() if p is not None]
+            self._cond.notify_all()
+        for process in processes:
+            _terminate(process)
+
+    def _position(self, entry: Tuple[int, int, str]) -> int:
+        return sorted(self._heap).index(entry) + 1
+
+    def _preempt(self) -> None:
+        """Stop running jobs of lower priority than the queued jobs left without a worker."""
+        free = self.max_workers - len(self._running) + len(self._stop_requests)
+        waiting = sorted(self._heap)[max(0, free):]
+        # Lowest priority first, and the most recently queued among equal priorities
+        victims = sorted(
+            (entry for job_id, (entry, _, _) in self._assigned.items() if job_id not in self._stop_requests),
+            reverse=True
+        )
+        for queued, victim in zip(waiting, victims):
+            if queued[0] >= victim[0]:
+                break
+            logger.info(f"Preempting job {victim[2]} (priority {-victim[0]}) "
+                        f"for job {queued[2]} (priority {-queued[0]})")
+            self._stop_requests[victim[2]] = "preempt"
+
+    def _start_workers(self) -> None:
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"training-worker-{len(self._workers)}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                if self._shutdown:
+                    return
+                _, _, job_id = heapq.heappop(self._heap)
+                assignment = self._pending.pop(job_id)
+                _, target, kwargs = assignment
+                self._running[job_id] = None
+                self._assigned[job_id] = assignment
+                self._started[job_id] = time.monotonic()
+            finished, stop_reason = True, None
+            try:
+                finished = self._run_job(job_id, target, kwargs)
+            except Exception as e:
+                logger.error(f"Scheduler failed to run job {job_id}: {str(e)}")
+                logger.error(traceback.format_exc())
+            finally:
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._assigned.pop(job_id, None)
+                    stop_reason = self._stop_requests.pop(job_id, None)
+                    self._busy_seconds += time.monotonic() - self._started.pop(job_id)
+
+            if stop_reason == "preempt" and not finished:
+                requeue_preempted(job_id)
+                with self._cond:
+                    if not self._shutdown:
+                        heapq.heappush(self._heap, assignment[0])
+                        self._pending[job_id] = assignment
+                        self._cond.notify()
+                continue
+            if stop_reason == "cancel":
+                delete_model(job_id)
+            record_job(job_id)
+
+    def _run_job(self, job_id: str, target: Callable, kwargs: Dict[str, Any]) -> bool:
+        """
+        Run a job in a child process, tracking the process so shutdown can kill it.
+
+        Returns:
+            bool: False if the job was stopped by a cancellation or preemption.
+        """
+        def started(process) -> None:
+            with self._cond:
+                self._running[job_id] = process
+
+        return run_job_process(
+            self._ctx, job_id, target, kwargs, self.timeout,
+            on_start=started, should_stop=lambda: job_id in self._stop_requests
+        )
+
+
+class QueueScheduler:
+    """
+    Coordinator of distributed execution, queueing jobs in the durable job queue.
+
+    Jobs are run by worker processes on this host, which share the queue and job store
+    databases, started with ``python -m mltrainingserver.worker``. This process
+    runs no training itself. A monitor thread reclaims jobs whose worker stopped
+    heartbeating, and hands jobs finished by the workers to the service metrics and
+    to the event stream. Cancellations and, with ``preemption``, preemptions are
+    requested through the queue and carried out by the workers at their next heartbeat.
+    """
+
+    def __init__(self, queue: SQLiteJobQueue, max_jobs: int, timeout: float, lease_seconds: float,
+                 poll_seconds: float, preemption: bool = False):
+        self.queue = queue
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.preemption = preemption
+        self._lock = threading.Lock()
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def submit(self, job_id: str, target: Callable, kwargs: Dict[str, Any], priority: int = 0) -> int:
+        """Queue a job and return its 1-based position in the queue."""
+        return self.submit_many([(job_id, target, kwargs, priority)])[0]
+
+    def submit_many(self, jobs: List[Tuple[str, Callable, Dict[str, Any], int]]) -> List[int]:
+        """
+        Queue several ``(job_id, target, kwargs, priority)`` jobs at once.
+
+        Either all jobs are queued or, when they do not all fit, none is.
+
+        Returns:
+            List[int]: The 1-based queue position of each job.
+        """
+        if self._stop.is_set():
+            raise RuntimeError("Scheduler is shut down")
+        self._start_monitor()
+        positions = self.queue.enqueue_many(
+            [(job_id, target_name(target), kwargs, priority) for job_id, target, kwargs, priority in jobs],
+            self.max_jobs
+        )
+        if self.preemption:
+            self.queue.preempt(self.lease_seconds)
+        return positions
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove a job from the queue, or have its worker kill it if it is running.
+
+        Returns:
+            bool: Whether the job was queued or running.
+        """
+        return self.queue.cancel(job_id)
+
+    def free_slots(self) -> int:
+        """Number of jobs that can still be queued."""
+        stats = self.queue.stats(self.lease_seconds)
+        return max(0, self.max_jobs - stats["queued"] - stats["leased"])
+
+    def is_full(self) -> bool:
+        """Whether the number of queued and running jobs has reached the limit."""
+        return self.free_slots() == 0
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Return the 1-based queue position of a pending job, or None if it is not queued."""
+        return self.queue.position(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the current queue depth and worker usage.
+
+        ``workers`` counts the workers that heartbeat within a lease period. The jobs of
+        workers that stop heartbeating are reassigned, so they do not count as started
+        workers that died.
+        """
+        self._start_monitor()
+        stats = self.queue.stats(self.lease_seconds)
+        return {
+            "queued": stats["queued"],
+            "running": stats["leased"],
+            "workers": stats["workers_alive"],
+            "workers_alive": stats["workers_alive"],
+            "workers_started": stats["workers_alive"],
+            "max_jobs": self.max_jobs,
+            "busy_seconds": stats["busy_seconds"],
+            "stuck": sum(seconds > self.timeout + STUCK_GRACE_SECONDS for seconds in stats["lease_ages"])
+        }
+
+    def shutdown(self) -> None:
+        """Stop the monitor; queued and running jobs are left to the workers."""
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+
+    def _start_monitor(self) -> None:
+        with self._lock:
+            if self._monitor is None and not self._stop.is_set():
+                self._monitor = threading.Thread(target=self._monitor_loop, name="queue-monitor", daemon=True)
+                self._monitor.start()
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                reclaim_expired_leases(self.queue)
+                if self.preemption:
+                    # Workers may have stopped or finished jobs since the last submission
+                    self.queue.preempt(self.lease_seconds)
+                for job_id in self.queue.collect_finished():
+                    record_job(job_id)
+                    job = training.job_store.get(job_id)
+                    if job is not None:
+                        job_events.publish(job_id, job)
+            except Exception as e:
+                logger.error(f"Job queue monitor failed: {str(e)}")
+                logger.error(traceback.format_exc())
+
+
+def create_scheduler(backend: str):
+    """Create the scheduler configured by ``EXECUTION_BACKEND``."""
+    if backend == "local":
+        return JobScheduler(
+            max_workers=settings.TRAINING_WORKERS,
+            max_jobs=settings.MAX_TRAINING_JOBS,
+            timeout=settings.TRAINING_TIMEOUT,
+            start_method=settings.TRAINING_START_METHOD,
+            preemption=settings.PREEMPTION_ENABLED
+        )
+    if backend == "queue":
+        if settings.JOB_STORE_BACKEND != "sqlite":
+            raise ValueError("EXECUTION_BACKEND 'queue' needs the sqlite job store shared with the workers")
+        return QueueScheduler(
+            SQLiteJobQueue(settings.QUEUE_PATH, max_attempts=settings.QUEUE_MAX_ATTEMPTS),
+            max_jobs=settings.MAX_TRAINING_JOBS,
+            timeout=settings.TRAINING_TIMEOUT,
+            lease_seconds=settings.QUEUE_LEASE_SECONDS,
+            poll_seconds=settings.QUEUE_POLL_SECONDS,
+            preemption=settings.PREEMPTION_ENABLED
+        )
+    raise ValueError(f"Unknown execution backend: {backend}")
+
+
+scheduler = create_scheduler(settings.EXECUTION_BACKEND)
@@ -0,0 +1,278 @@
+"""
+Module for serving predictions from trained models.
+"""
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .artifacts import load_model, on_model_deleted, read_manifest
+from .config import settings
+from .models import TrainingStatus
+from .training import get_job_status
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LoadedModel:
+    """A deserialized estimator together with the columns it was trained on."""
+
+    def __init__(self, job_id: str, model: Any, features: Optional[List[str]], nbytes: int,
+                 load_time: float = 0.0):
+        self.job_id = job_id
+        self.model = model
+        self.features = features
+        self.nbytes = nbytes
+        self.load_time = load_time
+
+    def to_frame(self, rows: List[Any]) -> pd.DataFrame:
+        """
+        Build the feature matrix of a request.
+
+        Args:
+            rows (List[Any]): Either dicts keyed by feature name or lists of values in
+                the order of the training features.
+
+        Raises:
+            ValueError: If the rows do not match the model's features.
+        """
+        if all(isinstance(row, dict) for row in rows):
+            df = pd.DataFrame.from_records(rows)
+            if self.features is None:
+                return df
+            missing = [name for name in self.features if name not in df.columns]
+            if missing:
+                raise ValueError(f"Rows are missing features: {missing}")
+            return df[self.features]
+        if any(isinstance(row, dict) for row in rows):
+            raise ValueError("Rows must be either all objects or all arrays")
+        width = len(self.features) if self.features is not None else None
+        for i, row in enumerate(rows):
+            if width is not None and len(row) != width:
+                raise ValueError(f"Row {i} has {len(row)} values, expected {width}")
+        return pd.DataFrame(rows, columns=self.features)
+
+
+def _model_nbytes(model_path: Path) -> int:
+    """Approximate in-memory size of a model, as recorded in its manifest."""
+    manifest = read_manifest(model_path)
+    if manifest is not None:
+        return manifest["memory_size"]
+    return model_path.stat().st_size
+
+
+class ModelCache:
+    """
+    LRU cache of deserialized models, bounded by their approximate size in memory.
+
+    Concurrent requests for a model that is not cached wait for a single load. Models
+    invalidated while they load are returned to the waiting requests but not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._models: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._invalidated: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    def get(self, job_id: str) -> LoadedModel:
+        """
+        Return the model of a completed job, loading it on a cache miss.
+
+        Raises:
+            ValueError: If the job does not exist or has no model.
+        """
+        with self._lock:
+            loaded = self._models.get(job_id)
+            if loaded is not None:
+                self._models.move_to_end(job_id)
+                self.hits += 1
+                return loaded
+            load_lock = self._loading.setdefault(job_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                loaded = self._models.get(job_id)
+                if loaded is not None:
+                    self._models.move_to_end(job_id)
+                    self.hits += 1
+                    return loaded
+                self.misses += 1
+            try:
+                loaded = self._load(job_id)
+            finally:
+                with self._lock:
+                    self._loading.pop(job_id, None)
+                    invalidated = job_id in self._invalidated
+                    self._invalidated.discard(job_id)
+            if not invalidated:
+                self._insert(loaded)
+            return loaded
+
+    def invalidate(self, job_id: str) -> None:
+        """Drop a model from the cache, e.g. after its artifact or job was deleted."""
+        with self._lock:
+            if job_id in self._loading:
+                self._invalidated.add(job_id)
+            loaded = self._models.pop(job_id, None)
+            if loaded is not None:
+                self._nbytes -= loaded.nbytes
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache size and hit counts."""
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "bytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_time": self.load_time
+            }
+
+    def _load(self, job_id: str) -> LoadedModel:
+        job = get_job_status(job_id)
+        if job["status"] != TrainingStatus.COMPLETE or not job.get("model_path"):
+            raise ValueError(f"Job {job_id} has no trained model")
+        model_path = Path(job["model_path"])
+        model, load_time = load_model(model_path)
+        with self._lock:
+            self.load_time += load_time
+        features = getattr(model, "feature_names_in_", None)
+        features = [str(name) for name in features] if features is not None else job.get("features")
+        return LoadedModel(job_id, model, features, _model_nbytes(model_path), load_time)
+
+    def _insert(self, loaded: LoadedModel) -> None:
+        with self._lock:
+            if loaded.job_id in self._models:
+                return
+            self._models[loaded.job_id] = loaded
+            self._nbytes += loaded.nbytes
+            # Keep at least the newest model even when it alone exceeds the limit
+            while self._nbytes > self.max_bytes and len(self._models) > 1:
+                job_id, evicted = self._models.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+                logger.info(f"Evicted model of job {job_id} from the model cache")
+
+
+class _Batch:
+    """Requests for one model waiting to be predicted together."""
+
+    def __init__(self, loaded: LoadedModel):
+        self.loaded = loaded
+        self.frames: List[pd.DataFrame] = []
+        self.futures: List[asyncio.Future] = []
+        self.rows = 0
+
+
+class PredictionBatcher:
+    """
+    Merges concurrent prediction requests for the same model into one vectorized call.
+
+    A request waits at most ``max_wait`` seconds for others to join its batch; a batch
+    reaching ``max_rows`` rows is predicted right away.
+    """
+
+    def __init__(self, max_rows: int, max_wait: float):
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._batches: Dict[str, _Batch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def predict(self, loaded: LoadedModel, frame: pd.DataFrame) -> np.ndarray:
+        """Predict the rows of ``frame``, batched with concurrent requests."""
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loaded.job_id)
+        if batch is not None and batch.loaded is not loaded:
+            # The model was reloaded; do not mix versions in one batch
+            self._flush(loaded.job_id, batch)
+            batch = None
+        if batch is None:
+            batch = _Batch(loaded)
+            self._batches[loaded.job_id] = batch
+            loop.call_later(self.max_wait, self._flush, loaded.job_id, batch)
+        future = loop.create_future()
+        batch.frames.append(frame)
+        batch.futures.append(future)
+        batch.rows += len(frame)
+        if batch.rows >= self.max_rows:
+            self._flush(loaded.job_id, batch)
+        return await future
+
+    def _flush(self, job_id: str, batch: _Batch) -> None:
+        if self._batches.get(job_id) is not batch:
+            return
+        del self._batches[job_id]
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        model = batch.loaded.model
+        try:
+            X = batch.frames[0] if len(batch.frames) == 1 else pd.concat(batch.frames, ignore_index=True)
+            predictions = await asyncio.to_thread(model.predict, X)
+        except Exception as e:
+            if len(batch.frames) == 1:
+                if not batch.futures[0].done():
+                    batch.futures[0].set_exception(e)
+                return
+            # Predict each request alone so that one bad request does not fail the others
+            for frame, future in zip(batch.frames, batch.futures):
+                try:
+                    result = await asyncio.to_thread(model.predict, frame)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                if not future.done():
+                    future.set_result(result)
+            return
+        offset = 0
+        for frame, future in zip(batch.frames, batch.futures):
+            if not future.done():
+                future.set_result(predictions[offset:offset + len(frame)])
+            offset += len(frame)
+
+
+def warmup(job_ids: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Load models into the cache ahead of their first prediction.
+
+    Returns:
+        Tuple[List[str], Dict[str, str]]: The loaded job IDs, and the error of each
+        job whose model could not be loaded.
+    """
+    loaded: List[str] = []
+    errors: Dict[str, str] = {}
+    for job_id in job_ids:
+        try:
+            model_cache.get(job_id)
+            loaded.append(job_id)
+        except Exception as e:
+            logger.warning(f"Failed to warm up model of job {job_id}: {str(e)}")
+            errors[job_id] = str(e)
+    return loaded, errors
+
+
+model_cache = ModelCache(settings.MODEL_CACHE_MAX_BYTES)
+on_model_deleted(model_cache.invalidate)
+prediction_batcher = PredictionBatcher(
+    max_rows=settings.PREDICT_MAX_BATCH_ROWS,
+    max_wait=settings.PREDICT_BATCH_WAIT_MS / 1000
+)
@@ -0,0 +1,232 @@
+"""
+Hyperparameter sweep module for ML training service.
+"""
+import itertools
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
+
+from .algorithms import AVAILABLE_ALGORITHMS, blas_threads, build_estimator, coerce_params, evaluate
+from .config import settings
+from .models import LeaderboardEntry, ParameterRange, SearchStrategy, TrainingMetrics, TrainingStatus
+from .artifacts import save_model
+from .training import PhaseTimer, job_threads, load_training_data, update_job
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Smallest training subset used in a successive halving round
+_MIN_HALVING_SAMPLES = 100
+
+
+def _sample(name: str, spec: Any, param_type: str, rng: np.random.Generator) -> Any:
+    """Draw one value for a parameter from a list of choices or a numeric range."""
+    if not isinstance(spec, ParameterRange):
+        return spec[rng.integers(len(spec))]
+    if param_type not in ("int", "float"):
+        raise ValueError(f"Parameter '{name}' of type {param_type} cannot be sampled from a range")
+    if spec.min > spec.max:
+        raise ValueError(f"Parameter '{name}' has min greater than max")
+    if spec.log:
+        if spec.min <= 0:
+            raise ValueError(f"Parameter '{name}' needs a positive min for log sampling")
+        value = math.exp(rng.uniform(math.log(spec.min), math.log(spec.max)))
+    else:
+        value = rng.uniform(spec.min, spec.max)
+    return int(round(value)) if param_type == "int" else value
+
+
+def build_candidates(algorithm: str, search: SearchStrategy, space: Dict[str, Any],
+                     n_iter: int = 10, random_state: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Expand a search space into the list of parameter sets to evaluate.
+
+    Args:
+        algorithm (str): The algorithm name.
+        search (SearchStrategy): Grid search takes every combination; random search
+            samples ``n_iter`` of them.
+        space (Dict[str, Any]): Candidate values per parameter, either a list or, for
+            random search, a ``ParameterRange``.
+        n_iter (int): Number of candidates sampled by random search.
+        random_state (Optional[int]): Seed for random search.
+
+    Returns:
+        List[Dict[str, Any]]: Distinct, type-checked parameter sets.
+
+    Raises:
+        ValueError: If the space is invalid for the algorithm or too large.
+    """
+    coerce_params(algorithm, {})
+    declared = AVAILABLE_ALGORITHMS[algorithm]["parameters"]
+    unknown = [name for name in space if name not in declared]
+    if unknown:
+        raise ValueError(f"Unknown parameters for {algorithm}: {unknown}")
+    for name, spec in space.items():
+        if not isinstance(spec, ParameterRange) and not spec:
+            raise ValueError(f"Parameter '{name}' has no candidate values")
+
+    names = list(space)
+    if search == SearchStrategy.GRID:
+        ranges = [name for name in names if isinstance(space[name], ParameterRange)]
+        if ranges:
+            raise ValueError(f"Grid search needs lists of values, got ranges for {ranges}")
+        size = math.prod(len(space[name]) for name in names)
+        if size > settings.SWEEP_MAX_CANDIDATES:
+            raise ValueError(f"Grid has {size} candidates, more than {settings.SWEEP_MAX_CANDIDATES}")
+        raw = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    else:
+        if n_iter > settings.SWEEP_MAX_CANDIDATES:
+            raise ValueError(f"n_iter must be at most {settings.SWEEP_MAX_CANDIDATES}")
+        rng = np.random.default_rng(random_state)
+        raw = [
+            {name: _sample(name, space[name], declared[name]["type"], rng) for name in names}
+            for _ in range(n_iter)
+        ]
+
+    candidates: List[Dict[str, Any]] = []
+    seen = set()
+    for params in raw:
+        params = coerce_params(algorithm, params)
+        key = tuple(sorted((name, repr(value)) for name, value in params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def _fit_candidate(algorithm: str, params: Dict[str, Any], X_train: Any, y_train: Any,
+                   X_val: Any, y_val: Any) -> Dict[str, Any]:
+    """Fit one candidate on a single thread and score it on the validation set."""
+    start_time = time.time()
+    try:
+        model = build_estimator(algorithm, params, n_jobs=1)
+        model.fit(X_train, y_train)
+        accuracy, loss = evaluate(algorithm, model, X_val, y_val)
+        return {"accuracy": accuracy, "loss": loss, "fit_time": time.time() - start_time, "error": None}
+    except Exception as e:
+        return {"accuracy": None, "loss": None, "fit_time": time.time() - start_time, "error": str(e)}
+
+
+def _score_key(result: Dict[str, Any]) -> Any:
+    """Sort key ranking results by accuracy, then loss; failed fits come last."""
+    if result["accuracy"] is None:
+        return (1, 0.0, 0.0)
+    return (0, -result["accuracy"], result["loss"])
+
+
+def run_sweep(job_id: str, dataset_hash: str, algorithm: str, candidates: List[Dict[str, Any]],
+              features: Optional[list] = None, target: Optional[str] = None,
+              validation_fraction: float = 0.2, successive_halving: bool = False,
+              halving_factor: int = 3, random_state: Optional[int] = None,
+              blob_id: Optional[str] = None) -> None:
+    """
+    Run a hyperparameter sweep for a job.
+
+    The dataset is loaded once and the candidates are fitted in parallel worker
+    processes, which share the training data through memory-mapped arrays. With
+    successive halving, all candidates start on a small subset of the training rows,
+    and each round keeps the best ``1 / halving_factor`` of them and multiplies the
+    rows by ``halving_factor``, until the last round uses all rows.
+    """
+    try:
+        update_job(job_id, status=TrainingStatus.RUNNING, started_at=datetime.utcnow().isoformat())
+        start_time = time.time()
+        timer = PhaseTimer(job_id)
+
+        X, y, _ = load_training_data(job_id, dataset_hash, features, target, timer=timer, blob_id=blob_id)
+        X_train, X_val, y_train, y_val = train_test_split(
+            X.to_numpy(), y.to_numpy(), test_size=validation_fraction, random_state=random_state
+        )
+
+        results: List[Dict[str, Any]] = [
+            {"sub_job_id": f"{job_id}-{i}", "params": params, "rounds": 0}
+            for i, params in enumerate(candidates)
+        ]
+        # Enough rounds that the last one has at most halving_factor candidates
+        rounds = 1
+        if successive_halving:
+            while halving_factor ** rounds < len(candidates):
+                rounds += 1
+        n_workers = settings.SWEEP_WORKERS or job_threads()
+        logger.info(f"Sweeping {len(candidates)} candidates for job {job_id} "
+                    f"in {rounds} round(s) on {n_workers} workers")
+
+        alive = results
+        completed = 0
+        with timer.phase("fit"), Parallel(n_jobs=n_workers, backend="loky") as parallel:
+            for round_index in range(rounds):
+                n_samples = max(
+                    min(len(X_train), _MIN_HALVING_SAMPLES),
+                    len(X_train) // halving_factor ** (rounds - 1 - round_index)
+                )
+                scores = parallel(
+                    delayed(_fit_candidate)(
+                        algorithm, result["params"],
+                        X_train[:n_samples], y_train[:n_samples], X_val, y_val
+                    )
+                    for result in alive
+                )
+                for result, score in zip(alive, scores):
+                    result.update(score, n_samples=n_samples, rounds=round_index + 1)
+                completed += len(alive)
+                update_job(job_id, completed_fits=completed, round=round_index + 1)
+
+                alive = sorted(alive, key=_score_key)
+                if round_index < rounds - 1:
+                    alive = alive[:max(1, math.ceil(len(alive) / halving_factor))]
+
+        # Candidates that survived more rounds rank above those eliminated earlier
+        ranked = sorted(results, key=lambda r: (-r["rounds"], _score_key(r)))
+        leaderboard = [
+            LeaderboardEntry(rank=rank, **result).dict()
+            for rank, result in enumerate(ranked, start=1)
+        ]
+        best = ranked[0]
+        if best["accuracy"] is None:
+            raise Exception(f"All candidates failed, first error: {best['error']}")
+        logger.info(f"Best candidate for job {job_id}: {best['params']} "
+                    f"(accuracy: {best['accuracy']:.4f}, loss: {best['loss']:.4f})")
+
+        # Refit the best candidate on the full dataset
+        threads = job_threads()
+        model = build_estimator(algorithm, best["params"], n_jobs=threads)
+        with timer.phase("fit"), threadpool_limits(limits=blas_threads(algorithm, threads)):
+            model.fit(X, y)
+        with timer.phase("serialize"):
+            artifact = save_model(job_id, model)
+
+        metrics = TrainingMetrics(
+            accuracy=best["accuracy"],
+            loss=best["loss"],
+            validation="holdout",
+            training_time=time.time() - start_time,
+            model_size=artifact["size"],
+            **timer.profile()
+        )
+        update_job(
+            job_id,
+            status=TrainingStatus.COMPLETE,
+            completed_at=datetime.utcnow().isoformat(),
+            metrics=metrics.dict(),
+            best_params=best["params"],
+            leaderboard=leaderboard,
+            model_path=artifact["path"],
+            artifact=artifact
+        )
+
+    except Exception as e:
+        logger.error(f"Sweep failed for job {job_id}: {str(e)}")
+        update_job(
+            job_id,
+            status=TrainingStatus.FAILED,
+            error=str(e),
+            completed_at=datetime.utcnow().isoformat()
+        )
@@ -0,0 +1,186 @@
+"""
+Module for exporting service metrics in the Prometheus text format.
+"""
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+# Upper bounds of the throughput buckets, in bytes per second
+THROUGHPUT_BUCKETS = tuple(2 ** exponent for exponent in range(16, 34, 2))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra is not None else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metric(name: str, kind: str, help_text: str,
+                  samples: Iterable[Tuple[Dict[str, Any], float]]) -> List[str]:
+    """
+    Format a counter or gauge in the Prometheus text exposition format.
+
+    Args:
+        name (str): Metric name.
+        kind (str): ``counter`` or ``gauge``.
+        help_text (str): Description of the metric.
+        samples (Iterable[Tuple[Dict[str, Any], float]]): ``(labels, value)`` pairs.
+
+    Returns:
+        List[str]: The lines of the metric family.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}")
+    return lines
+
+
+class Histogram:
+    """Cumulative histogram with a fixed set of buckets per label combination."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        """Format the histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: dict(value, counts=list(value["counts"])) for key, value in self._series.items()}
+        for labels, data in sorted(series.items()):
+            for bound, count in zip(self.buckets, data["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {data['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(data['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {data['count']}")
+        return lines
+
+
+class JobTelemetry:
+    """
+    Aggregates the phase timings and resource usage of finished jobs.
+
+    Jobs run in worker processes and report their timings and downloaded bytes on the
+    job record, so the counters are fed from the finished jobs in the API process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phase_seconds = Histogram(
+            "mltraining_job_phase_seconds", "Time spent by jobs in each phase", DURATION_BUCKETS
+        )
+        self.job_seconds = Histogram(
+            "mltraining_job_duration_seconds", "Time from job start to completion", DURATION_BUCKETS
+        )
+        self.download_throughput = Histogram(
+            "mltraining_download_throughput_bytes_per_second",
+            "Aggregator download throughput of jobs that downloaded their dataset", THROUGHPUT_BUCKETS
+        )
+        self.finished: Dict[str, int] = {}
+        self.bytes_downloaded = 0
+        self.download_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.dataset_cache = {"hit": 0, "miss": 0}
+
+    def record_job(self, job: Dict[str, Any]) -> None:
+        """Account for a job that has finished."""
+        status = str(getattr(job.get("status"), "value", job.get("status")))
+        timings = job.get("phase_timings") or {}
+        resources = job.get("resources") or {}
+        for phase, seconds in timings.items():
+            self.phase_seconds.observe(seconds, phase=phase)
+        if job.get("started_at") and job.get("completed_at"):
+            elapsed = (datetime.fromisoformat(job["completed_at"])
+                       - datetime.fromisoformat(job["started_at"])).total_seconds()
+            self.job_seconds.observe(max(0.0, elapsed), status=status)
+
+        downloaded = resources.get("bytes_downloaded", 0)
+        download_seconds = timings.get("download", 0.0)
+        if downloaded and download_seconds > 0:
+            self.download_throughput.observe(downloaded / download_seconds)
+        with self._lock:
+            self.finished[status] = self.finished.get(status, 0) + 1
+            self.cpu_seconds += resources.get("cpu_time", 0.0)
+            if "download" in timings:
+                self.dataset_cache["miss" if downloaded else "hit"] += 1
+            if downloaded:
+                self.bytes_downloaded += downloaded
+                self.download_seconds += download_seconds
+
+    def render(self) -> List[str]:
+        """Format the job metrics in the Prometheus text exposition format."""
+        with self._lock:
+            finished = dict(self.finished)
+            dataset_cache = dict(self.dataset_cache)
+            bytes_downloaded = self.bytes_downloaded
+            download_seconds = self.download_seconds
+            cpu_seconds = self.cpu_seconds
+        lookups = dataset_cache["hit"] + dataset_cache["miss"]
+        lines: List[str] = []
+        lines += format_metric(
+            "mltraining_jobs_finished_total", "counter", "Jobs finished since startup, by final status",
+            [({"status": status}, count) for status, count in sorted(finished.items())]
+        )
+        lines += self.job_seconds.render()
+        lines += self.phase_seconds.render()
+        lines += format_metric(
+            "mltraining_job_cpu_seconds_total", "counter", "CPU time used by finished jobs",
+            [({}, cpu_seconds)]
+        )
+        lines += format_metric(
+            "mltraining_job_bytes_downloaded_total", "counter", "Dataset bytes downloaded by finished jobs",
+            [({}, bytes_downloaded)]
+        )
+        lines += format_metric(
+            "mltraining_job_download_seconds_total", "counter",
+            "Time finished jobs spent downloading datasets they did not find cached",
+            [({}, download_seconds)]
+        )
+        lines += self.download_throughput.render()
+        lines += format_metric(
+            "mltraining_dataset_cache_requests_total", "counter", "Dataset lookups of finished jobs, by result",
+            [({"result": result}, count) for result, count in sorted(dataset_cache.items())]
+        )
+        lines += format_metric(
+            "mltraining_dataset_cache_hit_ratio", "gauge", "Share of job dataset lookups served from the cache",
+            [({}, dataset_cache["hit"] / lookups if lookups else 0.0)]
+        )
+        return lines
+
+
+job_telemetry = JobTelemetry()
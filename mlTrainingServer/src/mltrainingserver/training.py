@@ -3,153 +3,313 @@ Training module for ML training service.
 """
 import logging
 import os
+import resource
+import sys
 import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, Optional
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score
-import joblib
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
 
+from .aggregator import aggregator_client
+from .algorithms import blas_threads, build_estimator, evaluate
+from .artifacts import save_model
+from .cache import dataset_cache
+from .config import settings
+from .events import job_events
+from .jobstore import create_job_store
 from .models import TrainingStatus, TrainingMetrics
-from .getDataset import download_dataset
+from .getDataset import fetch_and_parse_blob, resolve_blob_id
+from .loader import load_dataset, read_columns
+from .validation import cross_validate, holdout_split
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# In-memory job store
-jobs: Dict[str, Dict[str, Any]] = {}
+# Job store
+job_store = create_job_store(settings.JOB_STORE_BACKEND, settings.JOB_STORE_PATH)
+
+# Receives (job_id, fields) instead of the job store; set in worker processes so
+# that the parent process remains the only writer of the jobs it runs
+_update_hook: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+def set_update_hook(hook: Optional[Callable[[str, Dict[str, Any]], None]]) -> None:
+    """Route job updates to a callback instead of the job store."""
+    global _update_hook
+    _update_hook = hook
+
+def update_job(job_id: str, **fields: Any) -> None:
+    """Apply field updates to a job."""
+    if _update_hook is not None:
+        _update_hook(job_id, fields)
+    else:
+        job_store.update(job_id, fields)
+        job_events.publish(job_id, fields)
+
+def transition_job(job_id: str, from_statuses: Iterable[str], **fields: Any) -> bool:
+    """Atomically update a job only if its status is one of ``from_statuses``."""
+    if not job_store.transition(job_id, from_statuses, fields):
+        return False
+    job_events.publish(job_id, fields)
+    return True
+
+def _resource_usage() -> Tuple[float, int]:
+    """CPU time in seconds and peak RSS in bytes of this process and its reaped children."""
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    cpu_time = sum(u.ru_utime + u.ru_stime for u in usage)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return cpu_time, max(u.ru_maxrss for u in usage) * scale
+
+class PhaseTimer:
+    """
+    Times the phases of a job and reports the current phase, timings and resource usage
+    as job updates.
+
+    Resource usage is measured on the process running the job, which is a dedicated
+    child process when jobs run through the scheduler.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.timings: Dict[str, float] = {}
+        self._cpu_start, _ = _resource_usage()
+        self._bytes_start = aggregator_client.metrics()["bytes_downloaded"]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase; repeated phases accumulate."""
+        update_job(self.job_id, phase=name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+            update_job(self.job_id, phase_timings=dict(self.timings), resources=self.resources())
+
+    def resources(self) -> Dict[str, Any]:
+        """CPU time, peak RSS and bytes downloaded since the timer was created."""
+        cpu_time, peak_rss = _resource_usage()
+        return {
+            "cpu_time": cpu_time - self._cpu_start,
+            "peak_rss_bytes": peak_rss,
+            "bytes_downloaded": aggregator_client.metrics()["bytes_downloaded"] - self._bytes_start
+        }
+
+    def profile(self) -> Dict[str, Any]:
+        """Phase timings and resource usage, as stored in ``TrainingMetrics``."""
+        return {"phase_timings": dict(self.timings), **self.resources()}
+
+def job_threads() -> int:
+    """Number of CPU threads a single training job may use."""
+    if settings.THREADS_PER_JOB:
+        return settings.THREADS_PER_JOB
+    return max(1, (os.cpu_count() or 1) // settings.TRAINING_WORKERS)
 
 def validate_access(dataset_hash: str) -> bool:
     """Validate access to the dataset."""
     # TODO: Implement actual access validation
     return True
 
+def check_columns(df: pd.DataFrame, features: List[str], target: str) -> None:
+    """
+    Reject columns that no estimator can train on, before any time is spent fitting.
+
+    Features must be numeric and the target must not be empty or have missing values.
+
+    Raises:
+        Exception: Listing every unusable column.
+    """
+    problems = []
+    non_numeric = [col for col in features if not pd.api.types.is_numeric_dtype(df[col].dtype)]
+    if non_numeric:
+        problems.append(f"non-numeric features {non_numeric}")
+    empty = [col for col in features if df[col].isna().all()]
+    if empty:
+        problems.append(f"features without values {empty}")
+    if df[target].isna().any():
+        problems.append(f"target '{target}' has missing values")
+    if problems:
+        raise Exception(f"Unusable columns: {'; '.join(problems)}")
+
+
+def load_training_data(job_id: str, dataset_hash: str, features: Optional[list] = None,
+                       target: Optional[str] = None,
+                       timer: Optional[PhaseTimer] = None,
+                       blob_id: Optional[str] = None) -> Tuple[Any, Any, Path]:
+    """
+    Fetch and load a job's dataset and split it into features and target.
+
+    ``blob_id`` is the plaintext blob ID resolved by the API when the job was
+    submitted; without it, the dataset hash is decrypted here. The decryption is timed
+    as the ``decrypt`` phase, the fetch as the
+    ``download`` phase (it includes the overlapped CSV parse on a cache miss) and the
+    load as the ``parse`` phase. Only the feature and
+    target columns are parsed, and unusable columns fail the job before training.
+    """
+    timer = timer or PhaseTimer(job_id)
+    # Only parse the requested columns when both features and target are known
+    columns = features + [target] if features is not None and target is not None else None
+
+    # Fetch dataset (served from the local cache when available)
+    logger.info(f"Fetching dataset for job {job_id}")
+    try:
+        if blob_id is None:
+            with timer.phase("decrypt"):
+                blob_id = resolve_blob_id(dataset_hash, "my-super-secret")
+        with timer.phase("download"):
+            dataset_path, parsed = fetch_and_parse_blob(blob_id, columns)
+        logger.info(f"Dataset available at {dataset_path}")
+        # Identical requests reuse this job only while the dataset content is the same
+        update_job(job_id, dataset_sha256=dataset_cache.checksum(blob_id))
+    except Exception as e:
+        logger.error(f"Failed to download dataset: {str(e)}")
+        raise Exception(f"Failed to download dataset: {str(e)}")
+
+    # Resolve the columns from the header before parsing anything else
+    header = read_columns(dataset_path)
+    if target is None:
+        target = header[-1]
+    elif target not in header:
+        raise Exception(f"Target column '{target}' not found in dataset")
+    if features is None:
+        features = [col for col in header if col != target]
+    else:
+        # Verify all requested features exist in the dataset
+        missing_features = [f for f in features if f not in header]
+        if missing_features:
+            raise Exception(f"Features not found in dataset: {missing_features}")
+
+    logger.info(f"Using features: {features}")
+    logger.info(f"Using target: {target}")
+
+    # Load and prepare data
+    logger.info(f"Loading dataset from {dataset_path}")
+    try:
+        with timer.phase("parse"):
+            df = load_dataset(dataset_path, features + [target], parsed=parsed)
+        if df.empty:
+            raise Exception("Dataset is empty after loading")
+        logger.info(f"Successfully loaded dataset with {len(df)} rows and {len(df.columns)} columns")
+    except Exception as e:
+        logger.error(f"Failed to load dataset: {str(e)}")
+        raise Exception(f"Failed to load dataset: {str(e)}")
+
+    check_columns(df, features, target)
+
+    X = df[features]
+    y = df[target]
+    return X, y, dataset_path
+
 def run_training(job_id: str, dataset_hash: str, algorithm: str, params: Dict[str, Any],
-                features: Optional[list] = None, target: Optional[str] = None) -> None:
-    """Run the training process for a job."""
-    dataset_path = None
+                features: Optional[list] = None, target: Optional[str] = None,
+                test_size: Optional[float] = None, cv_folds: Optional[int] = None,
+                shuffle: bool = True, random_state: Optional[int] = None,
+                blob_id: Optional[str] = None) -> None:
+    """
+    Run the training process for a job.
+
+    With ``test_size``, the model is fitted on the remaining rows and scored on the
+    held-out ones. With ``cv_folds``, k-fold cross-validation runs on the training
+    rows first, with the folds fitted in parallel. Without either, the model is scored
+    on its training rows.
+    """
     try:
         # Update job status
-        jobs[job_id]["status"] = TrainingStatus.RUNNING
-        jobs[job_id]["started_at"] = datetime.utcnow().isoformat()
+        update_job(job_id, status=TrainingStatus.RUNNING, started_at=datetime.utcnow().isoformat())
+        timer = PhaseTimer(job_id)
 
-        # Download dataset
-        logger.info(f"Downloading dataset for job {job_id}")
-        dataset_path = Path("datasets") / f"{job_id}.csv"
-        dataset_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        try:
-            # Download the dataset
-            download_dataset(dataset_hash, "my-super-secret", str(dataset_path))
-            
-            # Verify the file exists and has content
-            if not dataset_path.exists():
-                raise Exception(f"Downloaded file not found: {dataset_path}")
-            
-            if dataset_path.stat().st_size == 0:
-                raise Exception(f"Downloaded file is empty: {dataset_path}")
-                
-            logger.info(f"Dataset downloaded successfully to {dataset_path}")
-            
-        except Exception as e:
-            logger.error(f"Failed to download dataset: {str(e)}")
-            raise Exception(f"Failed to download dataset: {str(e)}")
-
-        # Load and prepare data
-        logger.info(f"Loading dataset from {dataset_path}")
-        try:
-            df = pd.read_csv(dataset_path)
-            if df.empty:
-                raise Exception("Dataset is empty after loading")
-            logger.info(f"Successfully loaded dataset with {len(df)} rows and {len(df.columns)} columns")
-        except Exception as e:
-            logger.error(f"Failed to load dataset: {str(e)}")
-            raise Exception(f"Failed to load dataset: {str(e)}")
-        
-        # Use provided features or all columns except target
-        if features is None:
-            features = [col for col in df.columns if col != target]
-        else:
-            # Verify all requested features exist in the dataset
-            missing_features = [f for f in features if f not in df.columns]
-            if missing_features:
-                raise Exception(f"Features not found in dataset: {missing_features}")
-        
-        # Use provided target or last column
-        if target is None:
-            target = df.columns[-1]
-        elif target not in df.columns:
-            raise Exception(f"Target column '{target}' not found in dataset")
-        
-        logger.info(f"Using features: {features}")
-        logger.info(f"Using target: {target}")
+        X, y, dataset_path = load_training_data(job_id, dataset_hash, features, target, timer=timer,
+                                                blob_id=blob_id)
+        threads = job_threads()
+
+        X_test = y_test = None
+        if test_size:
+            X, X_test, y, y_test = holdout_split(algorithm, X, y, test_size, shuffle, random_state)
+            logger.info(f"Holding out {len(X_test)} of {len(X) + len(X_test)} rows for testing")
 
-        X = df[features]
-        y = df[target]
+        folds = None
+        if cv_folds:
+            with timer.phase("cross_validate"):
+                folds = cross_validate(algorithm, params, X, y, cv_folds, shuffle, random_state, n_workers=threads)
 
         # Train model
         logger.info(f"Training {algorithm} model")
         start_time = time.time()
         
-        if algorithm == "linear_regression":
-            model = LinearRegression(**params)
+        model = build_estimator(algorithm, params, n_jobs=threads)
+        with timer.phase("fit"), threadpool_limits(limits=blas_threads(algorithm, threads)):
             model.fit(X, y)
-            
-            # Calculate metrics
-            y_pred = model.predict(X)
-            mse = mean_squared_error(y, y_pred)
-            r2 = r2_score(y, y_pred)
-            
-            metrics = TrainingMetrics(
-                accuracy=r2,  # Using R² as accuracy metric for regression
-                loss=mse,
-                training_time=time.time() - start_time,
-                model_size=dataset_path.stat().st_size
-            )
-            
-            logger.info(f"Training completed with R² score: {r2:.4f}, MSE: {mse:.4f}")
-        else:
-            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        training_time = time.time() - start_time
+
+        # Calculate metrics
+        with timer.phase("evaluate"), threadpool_limits(limits=blas_threads(algorithm, threads)):
+            if X_test is not None:
+                accuracy, loss = evaluate(algorithm, model, X_test, y_test)
+                validation = "holdout"
+            elif folds:
+                accuracy = float(np.mean([fold["accuracy"] for fold in folds]))
+                loss = float(np.mean([fold["loss"] for fold in folds]))
+                validation = "cv"
+            else:
+                accuracy, loss = evaluate(algorithm, model, X, y)
+                validation = "train"
+        
+        cv_metrics = {}
+        if folds:
+            cv_metrics = {
+                "cv_accuracy": float(np.mean([fold["accuracy"] for fold in folds])),
+                "cv_accuracy_std": float(np.std([fold["accuracy"] for fold in folds])),
+                "cv_loss": float(np.mean([fold["loss"] for fold in folds])),
+                "folds": folds
+            }
+        
+        logger.info(f"Training completed with accuracy: {accuracy:.4f}, loss: {loss:.4f}")
 
         # Save model
-        model_path = Path("models") / f"{job_id}.joblib"
-        model_path.parent.mkdir(parents=True, exist_ok=True)
-        joblib.dump(model, model_path)
-        logger.info(f"Model saved to {model_path}")
+        with timer.phase("serialize"):
+            artifact = save_model(job_id, model)
+
+        metrics = TrainingMetrics(
+            accuracy=accuracy,  # R² for regression
+            loss=loss,
+            training_time=training_time,
+            model_size=artifact["size"],
+            validation=validation,
+            **cv_metrics,
+            **timer.profile()
+        )
 
         # Update job status and metrics
-        jobs[job_id].update({
-            "status": TrainingStatus.COMPLETE,
-            "completed_at": datetime.utcnow().isoformat(),
-            "metrics": metrics.dict(),
-            "model_path": str(model_path)
-        })
+        update_job(
+            job_id,
+            status=TrainingStatus.COMPLETE,
+            completed_at=datetime.utcnow().isoformat(),
+            metrics=metrics.dict(),
+            model_path=artifact["path"],
+            artifact=artifact
+        )
 
     except Exception as e:
         logger.error(f"Training failed for job {job_id}: {str(e)}")
-        jobs[job_id].update({
-            "status": TrainingStatus.FAILED,
-            "error": str(e),
-            "completed_at": datetime.utcnow().isoformat()
-        })
-    finally:
-        # Clean up dataset file if it exists
-        if dataset_path and dataset_path.exists():
-            try:
-                dataset_path.unlink()
-                logger.info(f"Cleaned up dataset file: {dataset_path}")
-            except Exception as e:
-                logger.error(f"Failed to clean up dataset file: {str(e)}")
+        update_job(
+            job_id,
+            status=TrainingStatus.FAILED,
+            error=str(e),
+            completed_at=datetime.utcnow().isoformat()
+        )
 
 def create_job(dataset_hash: str, algorithm: str, params: Dict[str, Any],
-               features: Optional[list] = None, target: Optional[str] = None) -> str:
-    """Create a new training job."""
+               features: Optional[list] = None, target: Optional[str] = None,
+               fingerprint: Optional[str] = None) -> str:
+    """Create a new training job, optionally recording its request fingerprint for reuse."""
     job_id = str(uuid.uuid4())
-    jobs[job_id] = {
+    job_store.create({
         "job_id": job_id,  # Add job_id to the job data
         "status": TrainingStatus.PENDING,
         "created_at": datetime.utcnow().isoformat(),
@@ -157,15 +317,21 @@ def create_job(dataset_hash: str, algorithm: str, params: Dict[str, Any],
         "algorithm": algorithm,
         "params": params,
         "features": features,
-        "target": target
-    }
+        "target": target,
+        "fingerprint": fingerprint
+    })
     return job_id
 
 def get_job_status(job_id: str) -> Dict[str, Any]:
     """Get the status of a training job."""
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise ValueError(f"Job {job_id} not found")
-    return jobs[job_id]
+    return job
+
+def delete_job(job_id: str) -> None:
+    """Remove a job from the store."""
+    job_store.delete(job_id)
 
 def get_job_metrics(job_id: str) -> Dict[str, Any]:
     """Get the metrics for a completed training job."""
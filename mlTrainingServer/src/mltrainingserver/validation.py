@@ -0,0 +1,104 @@
+"""
+Module for hold-out and cross-validation of training jobs.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
+
+from .algorithms import AVAILABLE_ALGORITHMS, build_estimator, evaluate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _is_classification(algorithm: str) -> bool:
+    return AVAILABLE_ALGORITHMS[algorithm]["type"] == "classification"
+
+
+def holdout_split(algorithm: str, X: Any, y: Any, test_size: float,
+                  shuffle: bool = True, random_state: Optional[int] = None) -> Tuple[Any, Any, Any, Any]:
+    """
+    Split off a test set, stratified by class for classification when possible.
+
+    Returns:
+        Tuple[Any, Any, Any, Any]: ``X_train, X_test, y_train, y_test``.
+    """
+    if shuffle and _is_classification(algorithm):
+        try:
+            return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+        except ValueError:
+            # Classes with a single row cannot be stratified
+            pass
+    return train_test_split(
+        X, y, test_size=test_size, shuffle=shuffle,
+        random_state=random_state if shuffle else None
+    )
+
+
+def _fit_fold(algorithm: str, params: Dict[str, Any], fold: int, X: np.ndarray, y: np.ndarray,
+              train_index: np.ndarray, test_index: np.ndarray) -> Dict[str, Any]:
+    """Fit one fold on a single thread and score it on the fold's test rows."""
+    start_time = time.time()
+    model = build_estimator(algorithm, params, n_jobs=1)
+    model.fit(X[train_index], y[train_index])
+    fit_time = time.time() - start_time
+    start_time = time.time()
+    accuracy, loss = evaluate(algorithm, model, X[test_index], y[test_index])
+    return {
+        "fold": fold,
+        "accuracy": accuracy,
+        "loss": loss,
+        "fit_time": fit_time,
+        "score_time": time.time() - start_time,
+        "n_train": len(train_index),
+        "n_test": len(test_index)
+    }
+
+
+def cross_validate(algorithm: str, params: Dict[str, Any], X: Any, y: Any, folds: int,
+                   shuffle: bool = True, random_state: Optional[int] = None,
+                   n_workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Run k-fold cross-validation, fitting the folds in parallel worker processes.
+
+    Classification uses stratified folds. The data is shared with the workers through
+    memory-mapped arrays.
+
+    Args:
+        algorithm (str): The algorithm name.
+        params (Dict[str, Any]): Parameters as sent in the request.
+        X (Any): Features.
+        y (Any): Target.
+        folds (int): Number of folds.
+        shuffle (bool): Shuffle the rows before splitting them into folds.
+        random_state (Optional[int]): Seed for shuffling.
+        n_workers (int): Number of folds fitted at once.
+
+    Returns:
+        List[Dict[str, Any]]: Per-fold accuracy, loss, fit and score times, and row counts.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    splitter_class = StratifiedKFold if _is_classification(algorithm) else KFold
+    splitter = splitter_class(n_splits=folds, shuffle=shuffle, random_state=random_state if shuffle else None)
+    try:
+        splits = list(splitter.split(X, y))
+    except ValueError:
+        if splitter_class is KFold:
+            raise
+        # Too few rows of some class for stratified folds
+        splits = list(KFold(n_splits=folds, shuffle=shuffle,
+                            random_state=random_state if shuffle else None).split(X, y))
+
+    n_workers = max(1, min(n_workers, folds))
+    logger.info(f"Cross-validating {algorithm} over {folds} folds on {n_workers} workers")
+    with Parallel(n_jobs=n_workers, backend="loky") as parallel:
+        return parallel(
+            delayed(_fit_fold)(algorithm, params, fold, X, y, train_index, test_index)
+            for fold, (train_index, test_index) in enumerate(splits)
+        )
@@ -0,0 +1,191 @@
+"""
+Module running training workers that pull jobs from the durable job queue.
+
+Start one or more worker processes on the host of an API running with
+``EXECUTION_BACKEND=queue``::
+
+    python -m mltrainingserver.worker --concurrency 4
+
+The queue and job store are SQLite databases in WAL mode, which rely on memory shared
+by their readers and writers, so workers cannot use them from other hosts through a
+network filesystem.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import traceback
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .artifacts import delete_model
+from .config import settings
+from .jobqueue import SQLiteJobQueue, resolve_target
+from .models import TrainingStatus
+from .scheduler import ACTIVE_STATUSES, job_context, reclaim_expired_leases, requeue_preempted, run_job_process
+from . import training
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QueueWorker:
+    """
+    Worker process running jobs leased from the job queue.
+
+    Each of ``concurrency`` slots leases one job at a time and runs it in a child
+    process, renewing the lease every ``heartbeat_seconds``. When a renewal finds the
+    lease gone, the job has been handed to another worker and the child process is
+    killed. When it finds the job cancelled, the job is killed and its artifacts
+    removed; when it finds the job preempted, the job is killed and handed back to the
+    queue, as are running jobs on shutdown.
+    """
+
+    def __init__(self, queue: SQLiteJobQueue, concurrency: int, timeout: float, lease_seconds: float,
+                 heartbeat_seconds: float, poll_seconds: float, start_method: Optional[str] = None):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.host = socket.gethostname()
+        self.name = f"{self.host}:{os.getpid()}"
+        self._ctx = job_context(start_method)
+        self._stop = threading.Event()
+
+    def run(self) -> None:
+        """Run the worker slots until ``stop`` is called."""
+        slots: List[threading.Thread] = []
+        for index in range(self.concurrency):
+            slot = threading.Thread(
+                target=self._slot_loop,
+                args=(f"{self.name}:{index}",),
+                name=f"queue-worker-{index}"
+            )
+            slots.append(slot)
+            slot.start()
+        logger.info(f"Worker {self.name} running {self.concurrency} slots on {self.queue.path}")
+        for slot in slots:
+            # Join with a timeout so that the main thread keeps handling signals
+            while slot.is_alive():
+                slot.join(0.5)
+        logger.info(f"Worker {self.name} stopped")
+
+    def stop(self) -> None:
+        """Stop leasing jobs and hand running jobs back to the queue."""
+        self._stop.set()
+
+    def _slot_loop(self, worker_id: str) -> None:
+        self.queue.register_worker(worker_id, self.host, os.getpid())
+        try:
+            while not self._stop.is_set():
+                try:
+                    reclaim_expired_leases(self.queue)
+                    lease = self.queue.lease(worker_id, self.lease_seconds)
+                    if lease is None:
+                        self.queue.worker_heartbeat(worker_id)
+                except Exception as e:
+                    logger.error(f"Worker {worker_id} failed to lease a job: {str(e)}")
+                    lease = None
+                if lease is None:
+                    self._stop.wait(self.poll_seconds)
+                    continue
+                self._process(worker_id, lease)
+        finally:
+            self.queue.unregister_worker(worker_id)
+
+    def _heartbeat(self, lease: Dict[str, Any], done: threading.Event, stop: Dict[str, str]) -> None:
+        """
+        Renew a lease until the job is done, recording in ``stop`` why the job has to
+        stop: ``"lost"`` when the lease was lost, or the requested ``"cancel"`` or
+        ``"preempt"``.
+        """
+        while not done.wait(self.heartbeat_seconds):
+            try:
+                held, requested = self.queue.heartbeat(lease["job_id"], lease["token"], self.lease_seconds)
+                if not held or requested:
+                    stop["reason"] = requested or "lost"
+                    return
+            except Exception as e:
+                # The lease expires if renewals keep failing
+                logger.warning(f"Failed to renew lease of job {lease['job_id']}: {str(e)}")
+
+    def _process(self, worker_id: str, lease: Dict[str, Any]) -> None:
+        """Run a leased job and report its outcome to the queue."""
+        job_id = lease["job_id"]
+        logger.info(f"Worker {worker_id} leased job {job_id} (attempt {lease['attempt']})")
+        training.update_job(job_id, worker_id=worker_id, attempts=lease["attempt"])
+
+        done = threading.Event()
+        stop: Dict[str, str] = {}
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lease, done, stop), daemon=True)
+        heartbeat.start()
+        try:
+            target = resolve_target(lease["target"])
+            finished = run_job_process(
+                self._ctx, job_id, target, lease["kwargs"], self.timeout,
+                should_stop=lambda: bool(stop) or self._stop.is_set()
+            )
+        except Exception as e:
+            logger.error(f"Worker {worker_id} failed to run job {job_id}: {str(e)}")
+            logger.error(traceback.format_exc())
+            training.transition_job(
+                job_id,
+                ACTIVE_STATUSES,
+                status=TrainingStatus.FAILED,
+                error=str(e),
+                completed_at=datetime.utcnow().isoformat()
+            )
+            finished = True
+        finally:
+            done.set()
+            heartbeat.join()
+
+        reason = stop.get("reason")
+        if reason == "cancel":
+            delete_model(job_id)
+            self.queue.complete(job_id, lease["token"])
+            logger.info(f"Worker {worker_id} cancelled job {job_id}")
+        elif finished:
+            if not self.queue.complete(job_id, lease["token"]):
+                logger.warning(f"Job {job_id} finished after its lease was reclaimed")
+        elif reason == "lost":
+            logger.warning(f"Worker {worker_id} lost the lease of job {job_id} to another worker")
+        elif reason == "preempt":
+            if self.queue.release(job_id, lease["token"]):
+                requeue_preempted(job_id)
+                logger.info(f"Worker {worker_id} handed preempted job {job_id} back to the queue")
+        elif self.queue.release(job_id, lease["token"]):
+            training.transition_job(job_id, (TrainingStatus.RUNNING,), status=TrainingStatus.PENDING)
+            logger.info(f"Handed job {job_id} back to the queue")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a worker process until it receives SIGINT or SIGTERM."""
+    parser = argparse.ArgumentParser(description="Run training jobs from the job queue.")
+    parser.add_argument("--concurrency", type=int, default=settings.TRAINING_WORKERS,
+                        help="Jobs run at once by this process (default: TRAINING_WORKERS)")
+    args = parser.parse_args(argv)
+    if settings.JOB_STORE_BACKEND != "sqlite":
+        parser.error("workers need the sqlite job store shared with the API")
+
+    worker = QueueWorker(
+        SQLiteJobQueue(settings.QUEUE_PATH, max_attempts=settings.QUEUE_MAX_ATTEMPTS),
+        concurrency=args.concurrency,
+        timeout=settings.TRAINING_TIMEOUT,
+        lease_seconds=settings.QUEUE_LEASE_SECONDS,
+        heartbeat_seconds=settings.QUEUE_HEARTBEAT_SECONDS,
+        poll_seconds=settings.QUEUE_POLL_SECONDS,
+        start_method=settings.TRAINING_START_METHOD
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()